@@ -0,0 +1,28 @@
+"""Agent session service selection."""
+
+import os
+import logging
+
+from google.adk.sessions import BaseSessionService, DatabaseSessionService, InMemorySessionService
+
+from .database import DATABASE_URL, async_database_url
+
+logger = logging.getLogger(__name__)
+
+# Where agent sessions live: "memory" (per process, lost on restart) or
+# "database" (ADK's session tables in DATABASE_URL, shared by all workers)
+AGENT_SESSION_STORE = os.getenv("AGENT_SESSION_STORE", "memory")
+
+
+def create_agent_session_service() -> BaseSessionService:
+    """
+    Build the agent session service from environment configuration.
+
+    Returns:
+        DatabaseSessionService on DATABASE_URL (through its async driver) when
+        AGENT_SESSION_STORE is "database", otherwise InMemorySessionService
+    """
+    if AGENT_SESSION_STORE == "database":
+        logger.info("Agent sessions stored in the database")
+        return DatabaseSessionService(db_url=async_database_url(DATABASE_URL))
+    return InMemorySessionService()
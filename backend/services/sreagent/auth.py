@@ -2,11 +2,13 @@
 
 import logging
 from fastapi import Header, HTTPException, status, Depends, Request
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, Dict
 
 from .jwt_auth import verify_jwt_token
 from .token_service import TokenService
 from .session_service import SessionService
+from .auth_utils import hash_token
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,9 @@ async def get_current_user(request: Request) -> Dict:
     """
     FastAPI dependency to extract user from any authentication method.
     
+    Session lookups are awaited on the event loop; the blocking API token
+    lookup is run on the threadpool.
+    
     Supports:
     - JWT token in Authorization: Bearer <token> header
     - API token in X-API-Token header
@@ -41,7 +46,7 @@ async def get_current_user(request: Request) -> Dict:
     # Try API token (X-API-Token header)
     api_token = request.headers.get("X-API-Token")
     if api_token:
-        user_info = TokenService.verify_api_token(api_token)
+        user_info = await run_in_threadpool(TokenService.verify_api_token, api_token)
         if user_info:
             return user_info
     
@@ -52,10 +57,12 @@ async def get_current_user(request: Request) -> Dict:
         session_token = request.cookies.get("session_token")
     
     if session_token:
-        user_info = SessionService.get_session(session_token)
+        # Hash once for both the lookup and the activity update
+        token_hash = hash_token(session_token)
+        user_info = await SessionService.get_session(session_token, token_hash)
         if user_info:
             # Update session activity
-            SessionService.update_session_activity(session_token)
+            await SessionService.update_session_activity(token_hash)
             return user_info
     
     # No valid authentication found
@@ -1,16 +1,47 @@
 """Authentication utility functions for password hashing and token generation."""
 
+import os
 import secrets
 import hashlib
 import bcrypt
 import logging
+from datetime import datetime, timezone
+
+# Optional Argon2id hasher (argon2-cffi); bcrypt is used when it is missing
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:
+    PasswordHasher = None
 
 logger = logging.getLogger(__name__)
 
+# Argon2id parameters from environment (defaults follow the OWASP recommendation)
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))  # Iterations
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))  # KiB (64 MiB)
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "2"))  # Lanes per hash
+
+# Prefix of Argon2 hashes; anything else is treated as a bcrypt hash
+_ARGON2_PREFIX = "$argon2"
+# Version and cost prefix of the bcrypt hashes hash_password() produces, e.g. "$2b$12$"
+_BCRYPT_PREFIX = bcrypt.gensalt().decode()[:7]
+
+_password_hasher = (
+    PasswordHasher(
+        time_cost=ARGON2_TIME_COST,
+        memory_cost=ARGON2_MEMORY_COST,
+        parallelism=ARGON2_PARALLELISM,
+        hash_len=32,
+        salt_len=16,
+    )
+    if PasswordHasher is not None
+    else None
+)
+
 
 def hash_password(password: str) -> str:
     """
-    Hash a password using bcrypt.
+    Hash a password using Argon2id, or bcrypt if argon2-cffi is not installed.
     
     Args:
         password: Plain text password
@@ -18,6 +49,9 @@ def hash_password(password: str) -> str:
     Returns:
         Hashed password string
     """
+    if _password_hasher is not None:
+        return _password_hasher.hash(password)
+    
     # Generate salt and hash password
     salt = bcrypt.gensalt()
     password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
@@ -28,6 +62,9 @@ def verify_password(password: str, password_hash: str) -> bool:
     """
     Verify a password against a hash.
     
+    Accepts both Argon2 and bcrypt hashes, so passwords stored before
+    the switch to Argon2id keep working.
+    
     Args:
         password: Plain text password to verify
         password_hash: Stored password hash
@@ -35,6 +72,18 @@ def verify_password(password: str, password_hash: str) -> bool:
     Returns:
         True if password matches, False otherwise
     """
+    if password_hash.startswith(_ARGON2_PREFIX):
+        if _password_hasher is None:
+            logger.error("Cannot verify Argon2 password hash: argon2-cffi is not installed")
+            return False
+        try:
+            return _password_hasher.verify(password_hash, password)
+        except VerificationError:
+            return False
+        except InvalidHashError as e:
+            logger.error(f"Error verifying password: {e}")
+            return False
+    
     try:
         return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
     except Exception as e:
@@ -42,6 +91,26 @@ def verify_password(password: str, password_hash: str) -> bool:
         return False
 
 
+def needs_rehash(password_hash: str) -> bool:
+    """
+    Check whether a stored hash predates the current scheme or cost settings.
+    
+    Args:
+        password_hash: Stored password hash
+        
+    Returns:
+        True if the password should be re-hashed with hash_password()
+    """
+    if _password_hasher is not None:
+        if not password_hash.startswith(_ARGON2_PREFIX):
+            return True
+        try:
+            return _password_hasher.check_needs_rehash(password_hash)
+        except InvalidHashError:
+            return True
+    return not password_hash.startswith(_BCRYPT_PREFIX)
+
+
 def generate_token(length: int = 32) -> str:
     """
     Generate a secure random token.
@@ -68,6 +137,19 @@ def hash_token(token: str) -> str:
     return hashlib.sha256(token.encode('utf-8')).hexdigest()
 
 
+def as_utc(dt: datetime) -> datetime:
+    """
+    Treat naive datetimes read back from the database as UTC.
+    
+    Args:
+        dt: Datetime, naive (stored as UTC) or timezone-aware
+        
+    Returns:
+        Timezone-aware datetime
+    """
+    return dt.replace(tzinfo=timezone.utc) if dt.tzinfo is None else dt
+
+
 def validate_password(password: str) -> tuple[bool, str]:
     """
     Validate password meets requirements.
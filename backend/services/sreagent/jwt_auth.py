@@ -2,8 +2,10 @@
 
 import os
 import jwt
+import time
 import logging
 from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Dict, Optional
 
 logger = logging.getLogger(__name__)
@@ -15,6 +17,7 @@ JWT_SECRET = os.getenv("JWT_SECRET", "dev-secret-change-in-production")
 JWT_ALGORITHM = "HS256"
 JWT_ACCESS_TOKEN_EXPIRY = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRY", "900"))  # 15 minutes
 JWT_REFRESH_TOKEN_EXPIRY = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRY", "604800"))  # 7 days
+JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "8192"))  # Decoded tokens kept in memory
 
 if JWT_SECRET == "dev-secret-change-in-production":
     import warnings
@@ -55,6 +58,18 @@ def create_jwt_token(user_id: int, username: str, role: str, token_type: str = "
     return token
 
 
+@lru_cache(maxsize=JWT_CACHE_SIZE)
+def _decode_jwt(token: str) -> Dict:
+    """
+    Verify a JWT signature and decode its payload, memoized per token.
+    
+    Tokens are immutable, so a successful decode can be reused until the
+    token expires; callers must re-check "exp" on every hit. Invalid tokens
+    raise and are therefore never cached.
+    """
+    return jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+
+
 def verify_jwt_token(token: str) -> Optional[Dict]:
     """
     Verify and decode a JWT token.
@@ -66,8 +81,11 @@ def verify_jwt_token(token: str) -> Optional[Dict]:
         Decoded token payload as dict, or None if invalid
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        return payload
+        payload = _decode_jwt(token)
+        exp = payload.get("exp")
+        if exp is not None and exp <= time.time():
+            raise jwt.ExpiredSignatureError("Signature has expired")
+        return dict(payload)
     except jwt.ExpiredSignatureError:
         logger.warning("JWT token has expired")
         return None
@@ -0,0 +1,24 @@
+"""Add composite index for active session lookups
+
+Revision ID: 003_sessions_token_active
+Revises: 002_add_auth_tables
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003_sessions_token_active'
+down_revision = '002_add_auth_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Session authentication filters on session_token and is_active together
+    op.create_index('ix_sessions_token_active', 'sessions', ['session_token', 'is_active'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_token_active', table_name='sessions')
@@ -0,0 +1,33 @@
+"""Extend active session index with expires_at (covering on PostgreSQL)
+
+Revision ID: 004_sessions_token_active_cover
+Revises: 003_sessions_token_active
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004_sessions_token_active_cover'
+down_revision = '003_sessions_token_active'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Session lookups filter on session_token, is_active and expires_at; on
+    # PostgreSQL the INCLUDE columns let the index answer the lookup alone
+    op.drop_index('ix_sessions_token_active', table_name='sessions')
+    op.create_index(
+        'ix_sessions_token_active',
+        'sessions',
+        ['session_token', 'is_active', 'expires_at'],
+        unique=False,
+        postgresql_include=['user_id', 'last_activity_at'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sessions_token_active', table_name='sessions')
+    op.create_index('ix_sessions_token_active', 'sessions', ['session_token', 'is_active'], unique=False)
@@ -0,0 +1,31 @@
+"""Store session tokens hashed
+
+Revision ID: 005_hash_session_tokens
+Revises: 004_sessions_token_active_cover
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005_hash_session_tokens'
+down_revision = '004_sessions_token_active_cover'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # session_token now holds hash_token(token). Existing rows hold plain
+    # tokens that can no longer be matched, so end those sessions; users
+    # simply log in again.
+    op.execute(sa.text("UPDATE sessions SET is_active = :inactive WHERE is_active = :active").bindparams(
+        inactive=False, active=True,
+    ))
+
+
+def downgrade() -> None:
+    # Hashed tokens cannot be turned back into plain tokens
+    op.execute(sa.text("UPDATE sessions SET is_active = :inactive WHERE is_active = :active").bindparams(
+        inactive=False, active=True,
+    ))
@@ -0,0 +1,38 @@
+"""Store encrypted API key as binary
+
+Revision ID: 006_api_key_binary
+Revises: 005_hash_session_tokens
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_api_key_binary'
+down_revision = '005_hash_session_tokens'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Fernet tokens are ASCII, so the stored text converts to bytes unchanged
+    with op.batch_alter_table('model_settings') as batch_op:
+        batch_op.alter_column(
+            'api_key',
+            existing_type=sa.Text(),
+            type_=sa.LargeBinary(),
+            existing_nullable=False,
+            postgresql_using="convert_to(api_key, 'UTF8')",
+        )
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('model_settings') as batch_op:
+        batch_op.alter_column(
+            'api_key',
+            existing_type=sa.LargeBinary(),
+            type_=sa.Text(),
+            existing_nullable=False,
+            postgresql_using="convert_from(api_key, 'UTF8')",
+        )
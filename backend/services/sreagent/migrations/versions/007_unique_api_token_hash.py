@@ -0,0 +1,27 @@
+"""Make the API token hash index unique
+
+Revision ID: 007_unique_api_token_hash
+Revises: 006_api_key_binary
+Create Date: 2026-10-15 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_unique_api_token_hash'
+down_revision = '006_api_key_binary'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Every API request looks its token up by hash; a unique index lets the
+    # database stop at the first match
+    op.drop_index(op.f('ix_api_tokens_token_hash'), table_name='api_tokens')
+    op.create_index(op.f('ix_api_tokens_token_hash'), 'api_tokens', ['token_hash'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_api_tokens_token_hash'), table_name='api_tokens')
+    op.create_index(op.f('ix_api_tokens_token_hash'), 'api_tokens', ['token_hash'], unique=False)
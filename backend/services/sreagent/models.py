@@ -1,7 +1,7 @@
 """Database models for SRE Agent."""
 
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, Index
+from sqlalchemy import Column, Integer, String, Float, DateTime, Boolean, ForeignKey, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 
@@ -16,7 +16,7 @@ class ModelSettings(Base):
     id = Column(Integer, primary_key=True, default=1)
     model_provider = Column(String(50), nullable=False)  # e.g., "openai", "gemini"
     model_name = Column(String(100), nullable=False)  # e.g., "gpt-4", "gemini-2.0-flash"
-    api_key = Column(Text, nullable=False)  # Encrypted API key
+    api_key = Column(LargeBinary, nullable=False)  # Encrypted API key (Fernet token bytes)
     max_tokens = Column(Integer, nullable=True)  # Optional token limit
     temperature = Column(Float, nullable=True)  # Optional temperature (0.0-2.0)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -56,7 +56,7 @@ class ApiToken(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    token_hash = Column(String(255), nullable=False, index=True)  # Hashed token value
+    token_hash = Column(String(255), nullable=False, unique=True, index=True)  # Hashed token value
     name = Column(String(100), nullable=False)  # User-friendly name for the token
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     last_used_at = Column(DateTime, nullable=True)
@@ -76,7 +76,7 @@ class Session(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
-    session_token = Column(String(255), unique=True, nullable=False, index=True)
+    session_token = Column(String(255), unique=True, nullable=False, index=True)  # Hashed token value
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     expires_at = Column(DateTime, nullable=False)  # Absolute expiration
     last_activity_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -85,6 +85,18 @@ class Session(Base):
     # Relationship
     user = relationship("User", back_populates="sessions")
     
+    __table_args__ = (
+        # Hot-path lookup: WHERE session_token = ? AND is_active AND expires_at > ?
+        # (covering on PostgreSQL; other dialects ignore the INCLUDE columns)
+        Index(
+            "ix_sessions_token_active",
+            "session_token",
+            "is_active",
+            "expires_at",
+            postgresql_include=["user_id", "last_activity_at"],
+        ),
+    )
+    
     def __repr__(self):
         return f"<Session(id={self.id}, user_id={self.user_id}, is_active={self.is_active})>"
 
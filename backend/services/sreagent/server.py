@@ -1,47 +1,178 @@
 """FastAPI web server for SRE Agent."""
 
 import os
+import sys
+import json
 import logging
 import asyncio
+import anyio
+import multiprocessing
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
 from datetime import datetime, timezone
-from typing import Optional, List
-from fastapi import FastAPI, HTTPException, Depends
+from typing import Any, AsyncIterator, Callable, Dict, Optional, List
+from fastapi import FastAPI, HTTPException, Depends, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from google.adk.agents import Agent
+from cachetools import TTLCache
+from slowapi import Limiter, _rate_limit_exceeded_handler
+from slowapi.errors import RateLimitExceeded
+from slowapi.util import get_remote_address
+from google.adk.agents import Agent, RunConfig
+from google.adk.agents.run_config import StreamingMode
 from google.adk.runners import Runner
-from google.adk.sessions import InMemorySessionService
+from google.adk.sessions import BaseSessionService
 from google.genai import types
 
 from .agent import create_sre_agent
 from .security_scanner import SecurityScanner
-from .database import init_database
-from .settings_service import SettingsService
+from .database import init_database, close_database, close_async_database
+from .settings_service import SettingsService, close_async_http_client
 from .auth import require_auth, require_admin, get_current_user
 from .user_service import UserService
 from .token_service import TokenService
 from .session_service import SessionService
+from .agent_session_service import create_agent_session_service
 from .jwt_auth import create_jwt_token, refresh_jwt_token
-from .auth_utils import verify_password
+from .auth_utils import generate_token, hash_password, needs_rehash, verify_password
 from .init_auth import init_default_admin
 
+# Prefer uvloop's event loop when available (lower per-await overhead)
+try:
+    import uvloop
+    uvloop.install()
+except ImportError:
+    uvloop = None
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def _default_password_hash_workers() -> int:
+    """
+    Pick a password pool size that fits the container, not the host.
+    
+    os.cpu_count() reports the node's CPUs; the cgroup CPU quota (what the pod
+    limit sets) is the real budget. Capped at 2, since each Argon2 hash holds
+    ARGON2_MEMORY_COST (64 MiB by default) and already uses 2 lanes.
+    """
+    cpus = os.cpu_count() or 1
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, int(quota) // int(period))
+    except (OSError, ValueError):
+        pass
+    return max(1, min(cpus, 2))
+
+
 # Environment variables
 APP_NAME = os.getenv("APP_NAME", "sreagent")
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
 CLUSTER_INVENTORY_SERVICE_URL = os.getenv("CLUSTER_INVENTORY_SERVICE_URL", "http://cluster-inventory:8001")
+THREADPOOL_SIZE = int(os.getenv("THREADPOOL_SIZE", "200"))  # Worker threads for sync endpoints
+AGENT_EVENT_QUEUE_SIZE = int(os.getenv("AGENT_EVENT_QUEUE_SIZE", "64"))  # Max buffered agent events per request
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(_default_password_hash_workers())))  # Processes for password hashing work (0 = threads)
+LOGIN_RATE_LIMIT = os.getenv("LOGIN_RATE_LIMIT", "10/minute")  # Per client IP
+CHAT_RATE_LIMIT = os.getenv("CHAT_RATE_LIMIT", "60/minute")  # Per client IP
+RATE_LIMIT_STORAGE_URI = os.getenv("RATE_LIMIT_STORAGE_URI", "memory://")  # e.g. redis://redis:6379/0 to share across workers
+EXCEPTION_TRACEBACK_SAMPLE_RATE = int(os.getenv("EXCEPTION_TRACEBACK_SAMPLE_RATE", "10"))  # Log 1 in N tracebacks per error
+# Uvicorn worker processes when run as a script. Each worker keeps its own
+# caches and password pool, and by default its own agent sessions; set
+# AGENT_SESSION_STORE=database (and a shared RATE_LIMIT_STORAGE_URI) before
+# going above 1 so every worker sees the same session history.
+UVICORN_WORKERS = int(os.getenv("UVICORN_WORKERS", "1"))
+AGENT_SESSION_READY_CACHE_SIZE = int(os.getenv("AGENT_SESSION_READY_CACHE_SIZE", "10000"))  # Agent sessions remembered as existing
+AGENT_SESSION_READY_CACHE_TTL = int(os.getenv("AGENT_SESSION_READY_CACHE_TTL", "300"))  # Seconds before re-checking a session
+AGENT_INIT_TIMEOUT = float(os.getenv("AGENT_INIT_TIMEOUT", "10"))  # Seconds startup waits for the agent
+
+# datetime.fromisoformat accepts a trailing "Z" from Python 3.11 on; pick the
+# parser once at import instead of rewriting the string on every call
+if sys.version_info >= (3, 11):
+    _parse_iso_datetime = datetime.fromisoformat
+else:
+    def _parse_iso_datetime(value: str) -> datetime:
+        """Parse an ISO 8601 timestamp, accepting a trailing "Z"."""
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
 
 # Initialize FastAPI app
 app = FastAPI(
     title="SRE Agent API",
     description="Kubernetes Troubleshooting Chat Agent with MCP Integration",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
 )
 
+# Rate limit expensive endpoints (password checks, LLM calls) per client IP.
+# Behind the frontend nginx / ingress the client IP comes from X-Forwarded-For,
+# which uvicorn applies (--proxy-headers) only for peers in FORWARDED_ALLOW_IPS.
+# slowapi only drives the synchronous `limits` storages, so a redis:// storage
+# makes a blocking Redis round trip on the event loop for every limited
+# request; the memory:// default avoids that at the cost of per-process limits.
+limiter = Limiter(key_func=get_remote_address, storage_uri=RATE_LIMIT_STORAGE_URI)
+app.state.limiter = limiter
+app.add_exception_handler(RateLimitExceeded, _rate_limit_exceeded_handler)
+
+# Occurrences of each (exception type, path) seen in the last minute, used to
+# sample traceback formatting when the same error repeats
+_exception_counts: TTLCache = TTLCache(maxsize=1024, ttl=60)
+
+
+class UnhandledErrorMiddleware:
+    """
+    Pure ASGI middleware turning unhandled endpoint errors into generic 500s.
+    
+    Used instead of @app.exception_handler(Exception), after which Starlette's
+    ServerErrorMiddleware re-raises so uvicorn logs every traceback again, and
+    instead of @app.middleware("http"), which adds a task and stream hop to
+    every request. Tracebacks are sampled per (exception type, path); clients
+    only ever see "Internal server error".
+    """
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        response_started = False
+        
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            method, path = scope["method"], scope["path"]
+            key = (type(exc).__name__, path)
+            count = _exception_counts.get(key, 0) + 1
+            _exception_counts[key] = count
+            
+            if EXCEPTION_TRACEBACK_SAMPLE_RATE <= 1 or count % EXCEPTION_TRACEBACK_SAMPLE_RATE == 1:
+                logger.error(f"Unhandled error on {method} {path}: {exc}", exc_info=exc)
+            else:
+                logger.error(f"Unhandled error on {method} {path}: {exc!r} (seen {count} times, traceback sampled)")
+            
+            # Once headers are out there is no way to send a 500; the server
+            # closes the incomplete response
+            if not response_started:
+                response = ORJSONResponse(status_code=500, content={"detail": "Internal server error"})
+                await response(scope, receive, send)
+
+
+# Added before CORS so it sits inside it and 500s keep the CORS headers
+app.add_middleware(UnhandledErrorMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -52,10 +183,33 @@ app.add_middleware(
 )
 
 # Global session service and agent
-session_service: Optional[InMemorySessionService] = None
+session_service: Optional[BaseSessionService] = None
 agent: Optional[Agent] = None
 runner: Optional[Runner] = None
 security_scanner: Optional[SecurityScanner] = None
+password_pool: Optional[ProcessPoolExecutor] = None
+# Hash of a random password, verified against when a login names an unknown
+# user. Built at startup with hash_password(), so it has the same scheme and
+# cost as stored hashes
+dummy_password_hash: Optional[str] = None
+
+
+def _refresh_agent_state():
+    """
+    Recompute the agent-derived values served by /health and /settings/model/reload.
+    
+    Called whenever the agent or runner is (re)created, so health probes only
+    read a prebuilt response instead of inspecting the agent on every call.
+    """
+    tools_count = len(agent.tools) if agent is not None and agent.tools else 0
+    app.state.tools_count = tools_count
+    app.state.ready = agent is not None and runner is not None
+    # Pre-render the body; probes get the same bytes until the next change
+    app.state.cached_health = HealthResponse.model_construct(
+        status="healthy",
+        agent_ready=app.state.ready,
+        mcp_connected=tools_count > 0,
+    ).model_dump_json().encode()
 
 
 # Request/Response models
@@ -76,12 +230,29 @@ class HealthResponse(BaseModel):
     mcp_connected: bool
 
 
+_refresh_agent_state()
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize agent and MCP connection on startup."""
-    global session_service, agent, runner, security_scanner
+    global session_service, agent, runner, security_scanner, password_pool, dummy_password_hash
     
     logger.info("Initializing SRE Agent...")
+    app.state.agent_init_task = None
+    
+    # Sync endpoints and dependencies run on anyio's threadpool; raise its
+    # default of 40 so blocking DB calls don't queue under concurrent load
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    
+    # Password checks are CPU-bound hashing work; run them in separate processes
+    # so concurrent logins don't contend with request handling in this one
+    if PASSWORD_HASH_WORKERS > 0:
+        password_pool = ProcessPoolExecutor(
+            max_workers=PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    dummy_password_hash = await _run_password_work(hash_password, generate_token(16))
     
     try:
         # Initialize database
@@ -92,193 +263,490 @@ async def startup_event():
             init_default_admin()
         
         # Initialize session service
-        session_service = InMemorySessionService()
+        session_service = create_agent_session_service()
         
         # Initialize security scanner
         global security_scanner
         security_scanner = SecurityScanner(cluster_inventory_service_url=CLUSTER_INVENTORY_SERVICE_URL)
         logger.info("Security scanner initialized")
         
-        # Create agent (MCP tools are initialized internally)
-        logger.info("Initializing agent with MCP tools...")
-        agent = create_sre_agent()
-        logger.info(f"Agent initialized with {len(agent.tools) if agent.tools else 0} tools.")
-        
-        # Create runner
-        runner = Runner(
-            agent=agent,
-            app_name=APP_NAME,
-            session_service=session_service,
-        )
-        
-        logger.info("SRE Agent initialized successfully")
+        # Create agent (MCP tools are initialized internally) without letting
+        # a slow model/MCP setup hold up startup past AGENT_INIT_TIMEOUT
+        app.state.agent_init_task = asyncio.create_task(_init_agent())
+        try:
+            await asyncio.wait_for(asyncio.shield(app.state.agent_init_task), timeout=AGENT_INIT_TIMEOUT)
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"Agent initialization exceeded {AGENT_INIT_TIMEOUT}s; "
+                "continuing startup and finishing it in the background"
+            )
         
+    except Exception as e:
+        logger.error(f"Failed to initialize SRE Agent services: {e}")
+        if session_service is None:
+            session_service = create_agent_session_service()
+        if app.state.agent_init_task is None:
+            app.state.agent_init_task = asyncio.create_task(_init_agent())
+
+
+async def _init_agent():
+    """
+    Create the agent and runner off the event loop.
+    
+    /chat answers 503 and /health reports agent_ready=false until this
+    completes.
+    """
+    global agent, runner
+    
+    logger.info("Initializing agent with MCP tools...")
+    try:
+        new_agent = await asyncio.to_thread(create_sre_agent)
     except Exception as e:
         logger.error(f"Failed to initialize agent: {e}")
-        # Create agent without MCP tools as fallback
-        agent = create_sre_agent()
-        runner = Runner(
-            agent=agent,
-            app_name=APP_NAME,
-            session_service=InMemorySessionService(),
-        )
+        # Retry once; MCP tools may not be available
+        new_agent = await asyncio.to_thread(create_sre_agent)
         logger.warning("Agent initialized (MCP tools may not be available)")
+    
+    agent = new_agent
+    runner = Runner(
+        agent=agent,
+        app_name=APP_NAME,
+        session_service=session_service,
+    )
+    _refresh_agent_state()
+    logger.info(f"Agent initialized with {app.state.tools_count} tools.")
+    logger.info("SRE Agent initialized successfully")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Release resources on shutdown."""
+    global password_pool
+    
+    init_task = getattr(app.state, "agent_init_task", None)
+    if init_task is not None and not init_task.done():
+        init_task.cancel()
+    
+    if password_pool is not None:
+        password_pool.shutdown(wait=False, cancel_futures=True)
+        password_pool = None
+    close_database()
+    await close_async_database()
+    await close_async_http_client()
 
 
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint."""
-    return HealthResponse(
-        status="healthy",
-        agent_ready=agent is not None and runner is not None,
-        mcp_connected=agent is not None and agent.tools is not None and len(agent.tools) > 0,
-    )
+    return Response(content=app.state.cached_health, media_type="application/json")
 
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest, current_user: dict = Depends(require_auth)):
-    """Chat endpoint for interacting with the agent."""
-    if not agent or not runner:
-        raise HTTPException(status_code=503, detail="Agent not initialized")
+def _final_response_text(event) -> Optional[str]:
+    """Text of an ADK event's final response, or None."""
+    if event.is_final_response():
+        parts = event.content.parts if event.content else None
+        if parts:
+            return parts[0].text
+    return None
+
+
+def _attribute_text(event) -> Optional[str]:
+    """Text from a `text` or `message.text` attribute, or None."""
+    text = getattr(event, "text", None)
+    if text:
+        return text
+    message = getattr(event, "message", None)
+    if message:
+        return getattr(message, "text", None)
+    return None
+
+
+# Text extractor per event class, chosen once on first sight of the class
+_EVENT_TEXT_EXTRACTORS: Dict[type, Callable[[Any], Optional[str]]] = {}
+
+
+def _build_extractor(event_class: type) -> Callable[[Any], Optional[str]]:
+    """Pick and cache the text extractor for an event class."""
+    if callable(getattr(event_class, "is_final_response", None)):
+        extractor = _final_response_text
+    else:
+        extractor = _attribute_text
+    _EVENT_TEXT_EXTRACTORS[event_class] = extractor
+    return extractor
+
+
+def _extract_response_text(event) -> Optional[str]:
+    """
+    Extract response text from an agent event, if it carries any.
     
-    try:
-        # Get user_id from authenticated user
-        user_id = str(current_user["user_id"])
+    Args:
+        event: Event yielded by Runner.run_async
         
-        # Get or create session
-        session_id = request.session_id
-        if not session_id:
-            session_id = f"session_{user_id}"
+    Returns:
+        Response text, or None if the event has none
+    """
+    event_class = type(event)
+    extractor = _EVENT_TEXT_EXTRACTORS.get(event_class) or _build_extractor(event_class)
+    return extractor(event)
+
+
+async def _iter_agent_events(
+    user_id: str,
+    session_id: str,
+    content: types.Content,
+    run_config: Optional[RunConfig] = None,
+) -> AsyncIterator:
+    """
+    Yield agent events through a bounded queue.
+    
+    A producer task drains Runner.run_async into a queue of at most
+    AGENT_EVENT_QUEUE_SIZE events, so a runaway agent is held back by a
+    slow consumer instead of accumulating events in memory. The producer
+    is cancelled if the consumer stops early or the client disconnects.
+    
+    Args:
+        user_id: User ID
+        session_id: Agent session ID
+        content: User message
+        run_config: Optional run configuration
         
-        # Ensure session exists before running agent
-        # The Runner expects the session to already exist, so we must create it first
+    Yields:
+        Agent events, in order
+    """
+    queue: asyncio.Queue = asyncio.Queue(maxsize=AGENT_EVENT_QUEUE_SIZE)
+    done = object()
+    
+    async def _drain():
         try:
-            session = await session_service.get_session(
-                app_name=APP_NAME,
+            async with aclosing(runner.run_async(
                 user_id=user_id,
                 session_id=session_id,
-            )
-            logger.info(f"Using existing session: {session_id}")
+                new_message=content,
+                run_config=run_config,
+            )) as events:
+                async for event in events:
+                    await queue.put(event)
         except Exception as e:
-            # Create new session if it doesn't exist
-            logger.info(f"Creating new session: {session_id} (error: {e})")
-            try:
-                session = await session_service.create_session(
-                    app_name=APP_NAME,
-                    user_id=user_id,
-                    session_id=session_id,
-                )
-                logger.info(f"Session created successfully: {session_id}")
-            except Exception as create_error:
-                logger.error(f"Failed to create session: {create_error}")
-                raise HTTPException(status_code=500, detail=f"Failed to create session: {create_error}")
-        
-        # Verify session exists by trying to get it again
+            # Hand the failure to the consumer so it surfaces in the request
+            await queue.put(e)
+        else:
+            await queue.put(done)
+    
+    producer = asyncio.create_task(_drain())
+    try:
+        while True:
+            item = await queue.get()
+            queue.task_done()
+            if item is done:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        producer.cancel()
         try:
-            await session_service.get_session(
-                app_name=APP_NAME,
-                user_id=user_id,
-                session_id=session_id,
-            )
-            logger.info(f"Session verified: {session_id}")
-        except Exception as verify_error:
-            logger.error(f"Session verification failed: {verify_error}")
-            raise HTTPException(status_code=500, detail=f"Session not available: {verify_error}")
-        
-        # Create user message
-        content = types.Content(
-            role="user",
-            parts=[types.Part(text=request.message)],
-        )
+            await producer
+        except asyncio.CancelledError:
+            pass
+
+
+async def _stream_response_text(
+    user_id: str,
+    session_id: str,
+    content: types.Content,
+    streaming: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Run the agent and yield response text, recovering from lost sessions.
+    
+    Any failure drops the session from the ready set, so the next request
+    looks it up again instead of trusting it for AGENT_SESSION_READY_CACHE_TTL.
+    A "Session not found" error before any text was produced recreates the
+    session and retries once.
+    
+    Args:
+        user_id: User ID
+        session_id: Agent session ID
+        content: User message
+        streaming: Request incremental (partial) events from the model
         
-        # Run agent using async method to properly handle session access
-        logger.info(f"Running agent for session: {session_id}, user: {user_id}")
+    Yields:
+        Response text chunks
+    """
+    produced = False
+    try:
         try:
-            # Use run_async instead of run to properly handle async session operations
-            events = []
-            async for event in runner.run_async(
-                user_id=user_id,
-                session_id=session_id,
-                new_message=content,
-            ):
-                events.append(event)
-            logger.info(f"Collected {len(events)} events from agent")
+            async with aclosing(_run_response_text(user_id, session_id, content, streaming)) as chunks:
+                async for chunk in chunks:
+                    produced = True
+                    yield chunk
+            return
         except ValueError as ve:
-            if "Session not found" in str(ve):
-                logger.error(f"Session not found error: {ve}. Attempting to recreate session...")
-                # Try to create the session again and retry
-                try:
-                    await session_service.create_session(
-                        app_name=APP_NAME,
-                        user_id=user_id,
-                        session_id=session_id,
-                    )
-                    logger.info(f"Session recreated, retrying agent run...")
-                    events = []
-                    async for event in runner.run_async(
-                        user_id=user_id,
-                        session_id=session_id,
-                        new_message=content,
-                    ):
-                        events.append(event)
-                    logger.info(f"Retry successful, collected {len(events)} events")
-                except Exception as retry_error:
-                    logger.error(f"Retry failed: {retry_error}", exc_info=True)
-                    raise HTTPException(status_code=500, detail=f"Agent execution failed: {retry_error}")
-            else:
-                logger.error(f"ValueError in agent run: {ve}", exc_info=True)
+            if produced or "Session not found" not in str(ve):
                 raise
-        except Exception as e:
-            logger.error(f"Unexpected error in agent run: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Agent execution failed: {e}")
+            logger.error(f"Session not found error: {ve}. Attempting to recreate session...")
+            _forget_session(user_id, session_id)
         
-        # Collect response from events
-        response_text = ""
-        event_count = 0
-        for event in events:
-            event_count += 1
-            logger.debug(f"Event {event_count}: {type(event).__name__}, has is_final_response: {hasattr(event, 'is_final_response')}")
-            
-            # Check for final response
-            if hasattr(event, 'is_final_response') and callable(event.is_final_response):
-                if event.is_final_response():
-                    logger.info(f"Found final response event")
-                    if hasattr(event, 'content') and event.content:
-                        if hasattr(event.content, 'parts') and event.content.parts:
-                            if len(event.content.parts) > 0:
-                                if hasattr(event.content.parts[0], 'text'):
-                                    response_text = event.content.parts[0].text
-                                    logger.info(f"Extracted response text: {len(response_text)} chars")
-                                    break
+        await _ensure_session(user_id, session_id)
+        logger.info("Session recreated, retrying agent run...")
+        async with aclosing(_run_response_text(user_id, session_id, content, streaming)) as chunks:
+            async for chunk in chunks:
+                yield chunk
+    except Exception:
+        _forget_session(user_id, session_id)
+        raise
+
+
+async def _run_response_text(
+    user_id: str,
+    session_id: str,
+    content: types.Content,
+    streaming: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Run the agent once and yield response text as it is produced.
+    
+    With streaming enabled the model is called in SSE mode and each partial
+    event's text is yielded as a delta; the closing final event only
+    contributes whatever the partials did not already cover. Without
+    streaming the single final response text is yielded once.
+    
+    Args:
+        user_id: User ID
+        session_id: Agent session ID
+        content: User message
+        streaming: Request incremental (partial) events from the model
+        
+    Yields:
+        Response text chunks
+    """
+    run_config = RunConfig(streaming_mode=StreamingMode.SSE) if streaming else None
+    streamed = ""
+    async with aclosing(_iter_agent_events(user_id, session_id, content, run_config)) as events:
+        async for event in events:
+            if getattr(event, "partial", None):
+                content_ = getattr(event, "content", None)
+                parts = getattr(content_, "parts", None) if content_ else None
+                delta = getattr(parts[0], "text", None) if parts else None
+                if delta:
+                    streamed += delta
+                    yield delta
+                continue
             
-            # Check for text attribute directly
-            if hasattr(event, 'text') and event.text:
-                response_text = event.text
-                logger.info(f"Found text in event: {len(response_text)} chars")
+            text = _extract_response_text(event)
+            if text is not None:
+                logger.debug("Extracted response text: %d chars", len(text))
+                if streamed and text.startswith(streamed):
+                    text = text[len(streamed):]
+                if text:
+                    yield text
                 break
-            
-            # Check for message attribute
-            if hasattr(event, 'message') and event.message:
-                if hasattr(event.message, 'text'):
-                    response_text = event.message.text
-                    logger.info(f"Found message text: {len(response_text)} chars")
-                    break
+
+
+async def _collect_response(user_id: str, session_id: str, content: types.Content) -> str:
+    """
+    Run the agent and return its complete response text.
+    
+    Args:
+        user_id: User ID
+        session_id: Agent session ID
+        content: User message
         
-        logger.info(f"Processed {event_count} events, response length: {len(response_text)}")
+    Returns:
+        Response text (empty if the agent produced none)
+    """
+    chunks = []
+    async for chunk in _stream_response_text(user_id, session_id, content):
+        chunks.append(chunk)
+    return "".join(chunks)
+
+
+# Agent sessions known to exist, keyed by (user_id, session_id), and the
+# per-session locks that serialize their first lookup/creation
+_ready_sessions: TTLCache = TTLCache(maxsize=AGENT_SESSION_READY_CACHE_SIZE, ttl=AGENT_SESSION_READY_CACHE_TTL)
+_session_init_locks: Dict[tuple, asyncio.Lock] = {}
+
+
+def _forget_session(user_id: str, session_id: str):
+    """Drop a session from the ready set so the next request checks it again."""
+    _ready_sessions.pop((user_id, session_id), None)
+
+
+async def _ensure_session(user_id: str, session_id: str):
+    """
+    Make sure the agent session exists, creating it if needed.
+    
+    Sessions already seen are skipped without a lookup. Concurrent requests
+    for the same new session wait on one lock, so only the first does the
+    lookup/create and the rest reuse its result.
+    
+    Args:
+        user_id: User ID
+        session_id: Agent session ID
         
-        if not response_text:
-            logger.warning(f"No response text generated for session: {session_id} after processing {event_count} events")
-            response_text = "I received your message but couldn't generate a response."
+    Raises:
+        HTTPException: If the session cannot be created
+    """
+    key = (user_id, session_id)
+    if key in _ready_sessions:
+        return
+    
+    lock = _session_init_locks.setdefault(key, asyncio.Lock())
+    try:
+        async with lock:
+            if key in _ready_sessions:
+                return
+            await _get_or_create_session(user_id, session_id)
+            _ready_sessions[key] = True
+    finally:
+        if not lock.locked() and _session_init_locks.get(key) is lock:
+            del _session_init_locks[key]
+
+
+async def _get_or_create_session(user_id: str, session_id: str):
+    """
+    Fetch the agent session, creating it if it does not exist yet.
+    
+    The Runner expects the session to already exist, so it must be created
+    before running the agent. ADK session services return None for unknown
+    sessions; an exception from the lookup is treated the same way.
+    
+    Args:
+        user_id: User ID
+        session_id: Agent session ID
+        
+    Returns:
+        The agent session
         
-        logger.info(f"Generated response for session: {session_id}")
-        return ChatResponse(
-            response=response_text,
+    Raises:
+        HTTPException: If the session cannot be created
+    """
+    try:
+        session = await session_service.get_session(
+            app_name=APP_NAME,
+            user_id=user_id,
             session_id=session_id,
         )
-        
+    except (KeyError, ValueError) as e:
+        logger.info("Session lookup failed for %s: %s", session_id, e)
+        session = None
+    
+    if session is not None:
+        return session
+    
+    logger.info("Creating new session: %s", session_id)
+    try:
+        return await session_service.create_session(
+            app_name=APP_NAME,
+            user_id=user_id,
+            session_id=session_id,
+        )
+    except Exception as create_error:
+        logger.error(f"Failed to create session: {create_error}")
+        raise HTTPException(status_code=500, detail=f"Failed to create session: {create_error}")
+
+
+def _sse_chat_response(user_id: str, session_id: str, content: types.Content) -> StreamingResponse:
+    """
+    Stream an agent reply as Server-Sent Events.
+    
+    Emits a `data: {"delta": ...}` event per response chunk as the model
+    produces it, then a final `event: done` carrying the session ID. Errors
+    after the stream has started are reported as an `event: error`.
+    """
+    async def event_stream():
+        logger.info("Streaming agent response for session: %s, user: %s", session_id, user_id)
+        try:
+            async for delta in _stream_response_text(user_id, session_id, content, streaming=True):
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+            yield f"event: done\ndata: {json.dumps({'session_id': session_id})}\n\n"
+        except Exception as e:
+            logger.error(f"Error streaming chat response: {e}", exc_info=True)
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/chat", response_model=ChatResponse)
+@limiter.limit(CHAT_RATE_LIMIT)
+async def chat(
+    request: Request,
+    body: ChatRequest,
+    stream: bool = False,
+    current_user: dict = Depends(require_auth),
+):
+    """
+    Chat endpoint for interacting with the agent.
+    
+    With `?stream=true` the reply is sent as Server-Sent Events (same format
+    as /chat/stream) instead of a single JSON body.
+    """
+    if not agent or not runner:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    # Get user_id from authenticated user
+    user_id = str(current_user["user_id"])
+    
+    # Get or create session
+    session_id = body.session_id
+    if not session_id:
+        session_id = f"session_{user_id}"
+    
+    await _ensure_session(user_id, session_id)
+    
+    # Create user message
+    content = types.Content(
+        role="user",
+        parts=[types.Part(text=body.message)],
+    )
+    
+    if stream:
+        return _sse_chat_response(user_id, session_id, content)
+    
+    # Run agent using async method to properly handle session access
+    logger.info("Running agent for session: %s, user: %s", session_id, user_id)
+    try:
+        # Lost sessions are recreated and retried inside _stream_response_text
+        response_text = await _collect_response(user_id, session_id, content)
+    except HTTPException:
+        raise
     except Exception as e:
-        logger.error(f"Error processing chat request: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=str(e))
+        logger.error(f"Unexpected error in agent run: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=f"Agent execution failed: {e}")
+    
+    logger.debug("Response length: %d", len(response_text))
+    
+    if not response_text:
+        logger.warning("No response text generated for session: %s", session_id)
+        response_text = "I received your message but couldn't generate a response."
+    
+    logger.info("Generated response for session: %s", session_id)
+    # Serialize straight to JSON bytes; the body matches ChatResponse
+    return ORJSONResponse({"response": response_text, "session_id": session_id})
+
+
+@app.post("/chat/stream")
+@limiter.limit(CHAT_RATE_LIMIT)
+async def chat_stream(request: Request, body: ChatRequest, current_user: dict = Depends(require_auth)):
+    """Streaming chat endpoint (Server-Sent Events); see _sse_chat_response."""
+    if not agent or not runner:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    user_id = str(current_user["user_id"])
+    session_id = body.session_id or f"session_{user_id}"
+    
+    await _ensure_session(user_id, session_id)
+    
+    content = types.Content(
+        role="user",
+        parts=[types.Part(text=body.message)],
+    )
+    
+    return _sse_chat_response(user_id, session_id, content)
 
 
 @app.get("/")
@@ -291,6 +759,7 @@ async def root():
         "endpoints": {
             "health": "/health",
             "chat": "/chat",
+            "chat_stream": "/chat/stream",
             "docs": "/docs",
             "security": "/security",
             "settings": "/settings/model",
@@ -332,106 +801,108 @@ class UserInfoResponse(BaseModel):
     created_at: Optional[str] = None
 
 
+async def _run_password_work(func: Callable, *args):
+    """
+    Run a password hashing function without blocking the event loop.
+    
+    Uses the password process pool when available, otherwise a worker thread.
+    """
+    if password_pool is not None:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(password_pool, func, *args)
+    return await asyncio.to_thread(func, *args)
+
+
 @app.post("/auth/login", response_model=LoginResponse)
-async def login(request: LoginRequest):
+@limiter.limit(LOGIN_RATE_LIMIT)
+async def login(request: Request, body: LoginRequest):
     """Login with username and password."""
-    try:
-        # Get user by username
-        user = UserService.get_user_by_username(request.username)
-        if not user:
-            raise HTTPException(status_code=401, detail="Invalid username or password")
-        
-        # Verify password
-        if not verify_password(request.password, user["password_hash"]):
-            raise HTTPException(status_code=401, detail="Invalid username or password")
-        
-        # Check if user is active
-        if not user.get("is_active", True):
-            raise HTTPException(status_code=403, detail="User account is disabled")
-        
-        # Update last login
-        UserService.update_last_login(user["id"])
-        
-        # Create JWT tokens
-        access_token = create_jwt_token(user["id"], user["username"], user["role"], "access")
-        refresh_token = create_jwt_token(user["id"], user["username"], user["role"], "refresh")
-        
-        # Create session token
-        session_token = SessionService.create_session(user["id"])
-        
-        return LoginResponse(
-            access_token=access_token,
-            refresh_token=refresh_token,
-            session_token=session_token,
-            user={
-                "id": user["id"],
-                "username": user["username"],
-                "role": user["role"],
-            }
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Login error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Login failed: {str(e)}")
+    # Get user by username
+    user = await asyncio.to_thread(UserService.get_user_by_username, body.username)
+    if not user:
+        # Spend the same hashing time as for a real user so response
+        # latency doesn't reveal whether the username exists
+        await _run_password_work(verify_password, body.password, dummy_password_hash)
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    
+    # Verify password
+    if not await _run_password_work(verify_password, body.password, user["password_hash"]):
+        raise HTTPException(status_code=401, detail="Invalid username or password")
+    
+    # Check if user is active
+    if not user.get("is_active", True):
+        raise HTTPException(status_code=403, detail="User account is disabled")
+    
+    # Move hashes from before Argon2id (or older cost settings) onto the
+    # current scheme, so their verify time matches the unknown-user dummy
+    if needs_rehash(user["password_hash"]):
+        new_hash = await _run_password_work(hash_password, body.password)
+        await asyncio.to_thread(UserService.upgrade_password_hash, user["id"], user["password_hash"], new_hash)
+    
+    # Update last login (blocking, on a worker thread) and create the
+    # session token (async engine) concurrently
+    _, session_token = await asyncio.gather(
+        asyncio.to_thread(UserService.update_last_login, user["id"]),
+        SessionService.create_session(user["id"]),
+    )
+
+    # Create JWT tokens
+    access_token = create_jwt_token(user["id"], user["username"], user["role"], "access")
+    refresh_token = create_jwt_token(user["id"], user["username"], user["role"], "refresh")
+
+    # Serialize the fixed-shape body directly; it matches LoginResponse
+    return ORJSONResponse({
+        "access_token": access_token,
+        "refresh_token": refresh_token,
+        "session_token": session_token,
+        "user": {
+            "id": user["id"],
+            "username": user["username"],
+            "role": user["role"],
+        },
+    })
 
 
 @app.post("/auth/refresh", response_model=RefreshResponse)
-async def refresh(request: RefreshRequest):
+def refresh(request: RefreshRequest):
     """Refresh JWT access token."""
-    try:
-        tokens = refresh_jwt_token(request.refresh_token)
-        if not tokens:
-            raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
-        
-        return RefreshResponse(**tokens)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Token refresh error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Token refresh failed: {str(e)}")
+    tokens = refresh_jwt_token(request.refresh_token)
+    if not tokens:
+        raise HTTPException(status_code=401, detail="Invalid or expired refresh token")
+    
+    # Serialize the fixed-shape body directly; it matches RefreshResponse
+    return ORJSONResponse({
+        "access_token": tokens["access_token"],
+        "refresh_token": tokens["refresh_token"],
+    })
 
 
 @app.post("/auth/logout")
 async def logout(request: LogoutRequest, current_user: dict = Depends(require_auth)):
     """Logout (invalidate session)."""
-    try:
-        # If session token provided in request, use it; otherwise try to get from context
-        session_token = request.session_token
-        if session_token:
-            SessionService.invalidate_session(session_token)
-            return {"message": "Logged out successfully"}
-        else:
-            # Could extract from header/cookie if needed
-            return {"message": "Logged out successfully"}
-            
-    except Exception as e:
-        logger.error(f"Logout error: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Logout failed: {str(e)}")
+    # If session token provided in request, use it; otherwise try to get from context
+    session_token = request.session_token
+    if session_token:
+        await SessionService.invalidate_session(session_token)
+        return {"message": "Logged out successfully"}
+    else:
+        # Could extract from header/cookie if needed
+        return {"message": "Logged out successfully"}
 
 
 @app.get("/auth/me", response_model=UserInfoResponse)
-async def get_current_user_info(current_user: dict = Depends(require_auth)):
+def get_current_user_info(current_user: dict = Depends(require_auth)):
     """Get current user information."""
-    try:
-        user = UserService.get_user(current_user["user_id"])
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        return UserInfoResponse(
-            id=user["id"],
-            username=user["username"],
-            role=user["role"],
-            created_at=user.get("created_at"),
-        )
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting user info: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to get user info: {str(e)}")
+    user = UserService.get_user(current_user["user_id"])
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return UserInfoResponse.model_construct(
+        id=user["id"],
+        username=user["username"],
+        role=user["role"],
+        created_at=user.get("created_at"),
+    )
 
 
 # User management endpoints (admin only)
@@ -466,19 +937,19 @@ class ChangePasswordRequest(BaseModel):
     new_password: str
 
 
-@app.get("/users", response_model=List[UserResponse])
-async def list_users(admin: dict = Depends(require_admin)):
+@app.get(
+    "/users",
+    response_model=None,
+    responses={200: {"model": List[UserResponse]}},
+)
+def list_users(admin: dict = Depends(require_admin)):
     """List all users (admin only)."""
-    try:
-        users = UserService.list_users()
-        return [UserResponse(**user) for user in users]
-    except Exception as e:
-        logger.error(f"Error listing users: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to list users: {str(e)}")
+    # Rows are already response-shaped; skip per-row model construction
+    return UserService.list_users_as_dicts()
 
 
 @app.post("/users", response_model=UserResponse)
-async def create_user(request: CreateUserRequest, admin: dict = Depends(require_admin)):
+def create_user(request: CreateUserRequest, admin: dict = Depends(require_admin)):
     """Create a new user (admin only)."""
     try:
         user = UserService.create_user(
@@ -486,31 +957,22 @@ async def create_user(request: CreateUserRequest, admin: dict = Depends(require_
             password=request.password,
             role=request.role
         )
-        return UserResponse(**user)
+        return UserResponse.model_construct(**user)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error creating user: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to create user: {str(e)}")
 
 
 @app.get("/users/{user_id}", response_model=UserResponse)
-async def get_user(user_id: int, admin: dict = Depends(require_admin)):
+def get_user(user_id: int, admin: dict = Depends(require_admin)):
     """Get user details (admin only)."""
-    try:
-        user = UserService.get_user(user_id)
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        return UserResponse(**user)
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error getting user: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to get user: {str(e)}")
+    user = UserService.get_user(user_id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return UserResponse.model_construct(**user)
 
 
 @app.put("/users/{user_id}", response_model=UserResponse)
-async def update_user(user_id: int, request: UpdateUserRequest, admin: dict = Depends(require_admin)):
+def update_user(user_id: int, request: UpdateUserRequest, admin: dict = Depends(require_admin)):
     """Update user (admin only)."""
     try:
         update_data = {}
@@ -524,33 +986,22 @@ async def update_user(user_id: int, request: UpdateUserRequest, admin: dict = De
         user = UserService.update_user(user_id, **update_data)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
-        return UserResponse(**user)
+        return UserResponse.model_construct(**user)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating user: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to update user: {str(e)}")
 
 
 @app.delete("/users/{user_id}")
-async def delete_user(user_id: int, admin: dict = Depends(require_admin)):
+def delete_user(user_id: int, admin: dict = Depends(require_admin)):
     """Delete user (admin only)."""
-    try:
-        success = UserService.delete_user(user_id)
-        if not success:
-            raise HTTPException(status_code=404, detail="User not found")
-        return {"message": "User deleted successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error deleting user: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to delete user: {str(e)}")
+    success = UserService.delete_user(user_id)
+    if not success:
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"message": "User deleted successfully"}
 
 
 @app.post("/users/{user_id}/reset-password")
-async def reset_user_password(user_id: int, request: ResetPasswordRequest, admin: dict = Depends(require_admin)):
+def reset_user_password(user_id: int, request: ResetPasswordRequest, admin: dict = Depends(require_admin)):
     """Reset user password (admin only)."""
     try:
         success = UserService.reset_password(user_id, request.new_password)
@@ -559,15 +1010,10 @@ async def reset_user_password(user_id: int, request: ResetPasswordRequest, admin
         return {"message": "Password reset successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error resetting password: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to reset password: {str(e)}")
 
 
 @app.put("/users/me/password")
-async def change_password(request: ChangePasswordRequest, current_user: dict = Depends(require_auth)):
+def change_password(request: ChangePasswordRequest, current_user: dict = Depends(require_auth)):
     """Change own password (requires auth)."""
     try:
         success = UserService.change_password(
@@ -580,11 +1026,6 @@ async def change_password(request: ChangePasswordRequest, current_user: dict = D
         return {"message": "Password changed successfully"}
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error changing password: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to change password: {str(e)}")
 
 
 # Token management endpoints
@@ -611,50 +1052,37 @@ class CreateTokenResponse(BaseModel):
 
 
 @app.get("/tokens", response_model=List[TokenResponse])
-async def list_tokens(current_user: dict = Depends(require_auth)):
+def list_tokens(current_user: dict = Depends(require_auth)):
     """List own API tokens (requires auth)."""
-    try:
-        tokens = TokenService.list_api_tokens(current_user["user_id"])
-        return [TokenResponse(**token) for token in tokens]
-    except Exception as e:
-        logger.error(f"Error listing tokens: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to list tokens: {str(e)}")
+    tokens = TokenService.list_api_tokens(current_user["user_id"])
+    return [TokenResponse.model_construct(**token) for token in tokens]
 
 
 @app.post("/tokens", response_model=CreateTokenResponse)
-async def create_token(request: CreateTokenRequest, current_user: dict = Depends(require_auth)):
+def create_token(request: CreateTokenRequest, current_user: dict = Depends(require_auth)):
     """Create new API token (requires auth)."""
     try:
         expires_at = None
         if request.expires_at:
-            expires_at = datetime.fromisoformat(request.expires_at.replace('Z', '+00:00'))
+            expires_at = _parse_iso_datetime(request.expires_at)
         
         token_data = TokenService.create_api_token(
             user_id=current_user["user_id"],
             name=request.name,
             expires_at=expires_at
         )
-        return CreateTokenResponse(**token_data)
+        return CreateTokenResponse.model_construct(**token_data)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"Error creating token: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to create token: {str(e)}")
 
 
 @app.delete("/tokens/{token_id}")
-async def revoke_token(token_id: int, current_user: dict = Depends(require_auth)):
+def revoke_token(token_id: int, current_user: dict = Depends(require_auth)):
     """Revoke API token (requires auth, must own token)."""
-    try:
-        success = TokenService.revoke_api_token(token_id, current_user["user_id"])
-        if not success:
-            raise HTTPException(status_code=404, detail="Token not found or not owned by user")
-        return {"message": "Token revoked successfully"}
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error revoking token: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to revoke token: {str(e)}")
+    success = TokenService.revoke_api_token(token_id, current_user["user_id"])
+    if not success:
+        raise HTTPException(status_code=404, detail="Token not found or not owned by user")
+    return {"message": "Token revoked successfully"}
 
 
 # Settings API endpoints
@@ -700,120 +1128,94 @@ class ListModelsResponse(BaseModel):
 @app.post("/settings/models/list", response_model=ListModelsResponse)
 async def list_available_models(request: ListModelsRequest, admin: dict = Depends(require_admin)):
     """List available models for a provider (admin-only)."""
-    try:
-        logger.info(f"Listing models for provider: {request.provider}")
-        result = SettingsService.list_available_models(
-            provider=request.provider,
-            api_key=request.api_key
-        )
-        logger.info(f"Model listing result: success={result.get('success')}, models_count={len(result.get('models', []))}")
-        return ListModelsResponse(**result)
-    except Exception as e:
-        logger.error(f"Error listing models: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to list models: {str(e)}")
+    logger.info(f"Listing models for provider: {request.provider}")
+    result = await SettingsService.list_available_models_async(
+        provider=request.provider,
+        api_key=request.api_key
+    )
+    logger.info(f"Model listing result: success={result.get('success')}, models_count={len(result.get('models', []))}")
+    # Serialize directly; the body matches ListModelsResponse (models may be a shared tuple)
+    return ORJSONResponse(result)
 
 
 @app.post("/settings/model/validate", response_model=ValidateApiKeyResponse)
 async def validate_api_key(request: ValidateApiKeyRequest, admin: dict = Depends(require_admin)):
     """Validate API key without saving (admin-only)."""
-    try:
-        result = SettingsService.validate_api_key(
-            provider=request.provider,
-            model_name=request.model_name,
-            api_key=request.api_key
-        )
-        return ValidateApiKeyResponse(**result)
-    except Exception as e:
-        logger.error(f"Error validating API key: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to validate API key: {str(e)}")
+    result = await SettingsService.validate_api_key_async(
+        provider=request.provider,
+        model_name=request.model_name,
+        api_key=request.api_key
+    )
+    return ValidateApiKeyResponse.model_construct(**result)
 
 
 @app.get("/settings/model", response_model=ModelSettingsResponse)
-async def get_model_settings(admin: dict = Depends(require_admin)):
+def get_model_settings(admin: dict = Depends(require_admin)):
     """Get current model settings (admin-only)."""
-    try:
-        settings = SettingsService.get_model_settings()
-        if not settings:
-            raise HTTPException(status_code=404, detail="Model settings not configured")
-        return ModelSettingsResponse(**settings)
-    except HTTPException:
-        # Re-raise HTTP exceptions (like 404) as-is
-        raise
-    except Exception as e:
-        logger.error(f"Error getting model settings: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to get model settings: {str(e)}")
+    settings = SettingsService.get_model_settings()
+    if not settings:
+        raise HTTPException(status_code=404, detail="Model settings not configured")
+    return ModelSettingsResponse.model_construct(**settings)
 
 
 @app.put("/settings/model", response_model=ModelSettingsResponse)
 async def update_model_settings(request: ModelSettingsRequest, admin: dict = Depends(require_admin)):
     """Update model settings (admin-only, validates API key before saving)."""
-    try:
-        # Validate API key first
-        validation_result = SettingsService.validate_api_key(
-            provider=request.provider,
-            model_name=request.model_name,
-            api_key=request.api_key
-        )
-        
-        if not validation_result["valid"]:
-            raise HTTPException(
-                status_code=400,
-                detail=f"API key validation failed: {validation_result['message']}"
-            )
-        
-        # Update settings
-        success = SettingsService.update_model_settings(
-            provider=request.provider,
-            model_name=request.model_name,
-            api_key=request.api_key,
-            max_tokens=request.max_tokens,
-            temperature=request.temperature,
-            updated_by="admin"  # TODO: Get from auth context
+    # Validate API key first
+    validation_result = await SettingsService.validate_api_key_async(
+        provider=request.provider,
+        model_name=request.model_name,
+        api_key=request.api_key
+    )
+    
+    if not validation_result["valid"]:
+        raise HTTPException(
+            status_code=400,
+            detail=f"API key validation failed: {validation_result['message']}"
         )
-        
-        if not success:
-            raise HTTPException(status_code=500, detail="Failed to update model settings")
-        
-        # Get updated settings
-        settings = SettingsService.get_model_settings()
-        return ModelSettingsResponse(**settings)
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Error updating model settings: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to update model settings: {str(e)}")
+    
+    # Update settings
+    success = await asyncio.to_thread(
+        SettingsService.update_model_settings,
+        provider=request.provider,
+        model_name=request.model_name,
+        api_key=request.api_key,
+        max_tokens=request.max_tokens,
+        temperature=request.temperature,
+        updated_by="admin"  # TODO: Get from auth context
+    )
+    
+    if not success:
+        raise HTTPException(status_code=500, detail="Failed to update model settings")
+    
+    # Get updated settings
+    settings = await asyncio.to_thread(SettingsService.get_model_settings)
+    return ModelSettingsResponse.model_construct(**settings)
 
 
 @app.post("/settings/model/test", response_model=ValidateApiKeyResponse)
-async def test_saved_model_config(admin: dict = Depends(require_admin)):
+def test_saved_model_config(admin: dict = Depends(require_admin)):
     """Test saved model configuration using stored API key (admin-only)."""
-    try:
-        result = SettingsService.test_saved_configuration()
-        return ValidateApiKeyResponse(**result)
-    except Exception as e:
-        logger.error(f"Error testing saved model configuration: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to test saved configuration: {str(e)}")
+    result = SettingsService.test_saved_configuration()
+    return ValidateApiKeyResponse.model_construct(**result)
 
 
 @app.post("/settings/model/reload")
-async def reload_agent(admin: dict = Depends(require_admin)):
+def reload_agent(admin: dict = Depends(require_admin)):
     """Reload agent with new settings (admin-only)."""
     global agent, runner
     
-    try:
-        logger.info("Reloading agent with new settings...")
-        agent = create_sre_agent()
-        runner = Runner(
-            agent=agent,
-            app_name=APP_NAME,
-            session_service=session_service,
-        )
-        logger.info("Agent reloaded successfully")
-        return {"message": "Agent reloaded successfully", "tools_count": len(agent.tools) if agent.tools else 0}
-    except Exception as e:
-        logger.error(f"Error reloading agent: {e}", exc_info=True)
-        raise HTTPException(status_code=500, detail=f"Failed to reload agent: {str(e)}")
+    logger.info("Reloading agent with new settings...")
+    SettingsService.invalidate_settings_cache()
+    agent = create_sre_agent()
+    runner = Runner(
+        agent=agent,
+        app_name=APP_NAME,
+        session_service=session_service,
+    )
+    _refresh_agent_state()
+    logger.info("Agent reloaded successfully")
+    return {"message": "Agent reloaded successfully", "tools_count": app.state.tools_count}
 
 
 # Security scan endpoints
@@ -830,41 +1232,58 @@ class SecurityScanResponse(BaseModel):
     message: Optional[str] = None
 
 
-@app.post("/security/scan", response_model=SecurityScanResponse)
-async def trigger_security_scan(request: SecurityScanRequest, admin: dict = Depends(require_admin)):
-        """Trigger a security scan for one or all clusters."""
+async def _run_security_scan(cluster_id: Optional[str], namespaces: Optional[List[str]], scan_id: Optional[str] = None):
+    """Run a security scan in the background; results go to scan storage."""
+    try:
+        if cluster_id:
+            await security_scanner.scan_cluster_async(
+                cluster_id=cluster_id,
+                namespaces=namespaces,
+                scan_id=scan_id,
+            )
+        else:
+            results = await security_scanner.scan_all_clusters_async(namespaces=namespaces)
+            logger.info(f"Security scan completed for {len(results)} clusters")
+    except Exception as e:
+        # The scanner has already stored an error result for the cluster
+        logger.error(f"Background security scan {scan_id or 'all-clusters'} failed: {e}")
+
+
+@app.post("/security/scan", response_model=SecurityScanResponse, status_code=202)
+async def trigger_security_scan(
+    request: SecurityScanRequest,
+    background_tasks: BackgroundTasks,
+    admin: dict = Depends(require_admin),
+):
+        """
+        Queue a security scan for one or all clusters.
+        
+        Returns immediately; poll /security/scans/{cluster_id}/latest for results.
+        """
         if not security_scanner:
             raise HTTPException(status_code=503, detail="Security scanner not initialized")
         
-        try:
-            if request.cluster_id:
-                # Scan single cluster
-                result = await security_scanner.scan_cluster_async(
-                    cluster_id=request.cluster_id,
-                    namespaces=request.namespaces,
-                )
-                return SecurityScanResponse(
-                    scan_id=result["scan_id"],
-                    cluster_id=result["cluster_id"],
-                    status=result["status"],
-                    timestamp=result["timestamp"],
-                    message="Security scan completed"
-                )
-            else:
-                # Scan all clusters
-                results = await security_scanner.scan_all_clusters_async(
-                    namespaces=request.namespaces,
-                )
-                return SecurityScanResponse(
-                    scan_id="all-clusters",
-                    cluster_id="all",
-                    status="completed",
-                    timestamp=datetime.now(timezone.utc).isoformat(),
-                    message=f"Security scan completed for {len(results)} clusters"
-                )
-        except Exception as e:
-            logger.error(f"Security scan failed: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Security scan failed: {e}")
+        if request.cluster_id:
+            # Scan single cluster
+            scan_id = str(uuid.uuid4())
+            background_tasks.add_task(_run_security_scan, request.cluster_id, request.namespaces, scan_id)
+            return SecurityScanResponse(
+                scan_id=scan_id,
+                cluster_id=request.cluster_id,
+                status="queued",
+                timestamp=datetime.now(timezone.utc).isoformat(),
+                message="Security scan queued"
+            )
+        else:
+            # Scan all clusters (each cluster scan gets its own scan ID)
+            background_tasks.add_task(_run_security_scan, None, request.namespaces)
+            return SecurityScanResponse(
+                scan_id="all-clusters",
+                cluster_id="all",
+                status="queued",
+                timestamp=datetime.now(timezone.utc).isoformat(),
+                message="Security scan queued for all clusters"
+            )
 
 @app.get("/security/scans/{cluster_id}")
 async def get_security_scans(cluster_id: str, limit: Optional[int] = 10, admin: dict = Depends(require_admin)):
@@ -872,15 +1291,11 @@ async def get_security_scans(cluster_id: str, limit: Optional[int] = 10, admin:
         if not security_scanner:
             raise HTTPException(status_code=503, detail="Security scanner not initialized")
         
-        try:
-            results = await security_scanner.scan_storage.get_scan_results(
-                cluster_id=cluster_id,
-                limit=limit,
-            )
-            return {"cluster_id": cluster_id, "scans": results}
-        except Exception as e:
-            logger.error(f"Failed to get scan results: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Failed to get scan results: {e}")
+        results = await security_scanner.scan_storage.get_scan_results(
+            cluster_id=cluster_id,
+            limit=limit,
+        )
+        return {"cluster_id": cluster_id, "scans": results}
 
 @app.get("/security/scans/{cluster_id}/latest")
 async def get_latest_scan(cluster_id: str):
@@ -888,19 +1303,27 @@ async def get_latest_scan(cluster_id: str):
         if not security_scanner:
             raise HTTPException(status_code=503, detail="Security scanner not initialized")
         
-        try:
-            result = await security_scanner.scan_storage.get_latest_scan(cluster_id)
-            if not result:
-                raise HTTPException(status_code=404, detail="No scan results found")
-            return result
-        except HTTPException:
-            raise
-        except Exception as e:
-            logger.error(f"Failed to get latest scan: {e}", exc_info=True)
-            raise HTTPException(status_code=500, detail=f"Failed to get latest scan: {e}")
+        result = await security_scanner.scan_storage.get_latest_scan(cluster_id)
+        if not result:
+            raise HTTPException(status_code=404, detail="No scan results found")
+        return result
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=HOST, port=PORT)
+    try:
+        import httptools  # noqa: F401
+        http_impl = "httptools"
+    except ImportError:
+        http_impl = "h11"
+    # Multiple workers need the app as an import string
+    uvicorn.run(
+        "backend.services.sreagent.server:app",
+        host=HOST,
+        port=PORT,
+        workers=UVICORN_WORKERS,
+        loop="uvloop" if uvloop else "asyncio",
+        http=http_impl,
+        proxy_headers=True,  # Trusted proxies come from FORWARDED_ALLOW_IPS
+    )
 
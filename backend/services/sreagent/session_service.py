@@ -1,28 +1,55 @@
 """Session management service for web authentication."""
 
 import os
+import time
 import logging
+import threading
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict
-from sqlalchemy.orm import Session
+from typing import Optional, Dict, Set
+from cachetools import TTLCache
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
-from .database import get_db_session
+from .database import get_async_db_session
 from .models import Session as SessionModel, User
-from .auth_utils import generate_token, hash_token
+from .auth_utils import as_utc, generate_token, hash_token
 
 logger = logging.getLogger(__name__)
 
 # Session configuration from environment
 SESSION_EXPIRY_HOURS = int(os.getenv("SESSION_EXPIRY_HOURS", "24"))  # Inactivity expiry
 SESSION_ABSOLUTE_EXPIRY_DAYS = int(os.getenv("SESSION_ABSOLUTE_EXPIRY_DAYS", "7"))  # Absolute expiry
+SESSION_CACHE_MAXSIZE = int(os.getenv("SESSION_CACHE_MAXSIZE", "10000"))
+# Cached sessions live per process: logout, deactivation or a password change
+# clears only this worker's copy, so with several workers (UVICORN_WORKERS) a
+# revoked session can keep authenticating elsewhere for up to this long
+SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", "30"))  # seconds
+SESSION_ACTIVITY_UPDATE_INTERVAL = int(os.getenv("SESSION_ACTIVITY_UPDATE_INTERVAL", "60"))  # seconds between activity writes
+
+# Validated sessions keyed by hash_token(session_token) ->
+# (valid_until, session info, last_activity_at). valid_until is a
+# time.monotonic() deadline capped at the session's own expiry, so a cached
+# session never outlives the one in the database; last_activity_at lets
+# update_session_activity skip the database while the last write is recent.
+_session_cache: TTLCache = TTLCache(maxsize=SESSION_CACHE_MAXSIZE, ttl=SESSION_CACHE_TTL)
+# Cached token hashes per user_id, so a user's sessions can be dropped without
+# scanning the cache. Entries may name hashes already evicted from the cache;
+# they are pruned when the user's next session is cached.
+_user_session_hashes: Dict[int, Set[str]] = {}
+_session_cache_lock = threading.Lock()
 
 
 class SessionService:
-    """Service for managing user sessions."""
+    """
+    Service for managing user sessions.
+    
+    Methods are async and use the async engine, since they run on every
+    session-authenticated request.
+    """
     
     @staticmethod
-    def create_session(user_id: int) -> str:
+    async def create_session(user_id: int) -> str:
         """
         Create a new session for a user.
         
@@ -32,7 +59,7 @@ class SessionService:
         Returns:
             Session token (plain text, only shown once)
         """
-        db: Session = get_db_session()
+        db: AsyncSession = get_async_db_session()
         try:
             # Generate session token
             session_token = generate_token(32)
@@ -41,10 +68,10 @@ class SessionService:
             now = datetime.now(timezone.utc)
             absolute_expires_at = now + timedelta(days=SESSION_ABSOLUTE_EXPIRY_DAYS)
             
-            # Create session record
+            # Create session record (only the hash is stored)
             session = SessionModel(
                 user_id=user_id,
-                session_token=session_token,
+                session_token=hash_token(session_token),
                 created_at=now,
                 expires_at=absolute_expires_at,
                 last_activity_at=now,
@@ -52,68 +79,94 @@ class SessionService:
             )
             
             db.add(session)
-            db.commit()
-            db.refresh(session)
+            await db.commit()
             
             logger.info(f"Created session for user {user_id}")
             return session_token
             
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error creating session: {e}")
             raise
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Error creating session: {e}")
             raise
         finally:
-            db.close()
+            await db.close()
     
     @staticmethod
-    def get_session(session_token: str) -> Optional[Dict]:
+    async def get_session(session_token: str, token_hash: Optional[str] = None) -> Optional[Dict]:
         """
         Get session information.
         
         Args:
             session_token: Session token
+            token_hash: hash_token(session_token), if the caller already has it
             
         Returns:
             Dict with session info including user_id, username, role, or None if invalid
         """
-        db: Session = get_db_session()
+        if token_hash is None:
+            token_hash = hash_token(session_token)
+        with _session_cache_lock:
+            cached = _session_cache.get(token_hash)
+        if cached is not None:
+            valid_until, info, _ = cached
+            if time.monotonic() < valid_until:
+                return dict(info)
+            with _session_cache_lock:
+                _session_cache.pop(token_hash, None)
+        
+        db: AsyncSession = get_async_db_session()
         try:
             now = datetime.now(timezone.utc)
             
-            # Find active session
-            session = db.query(SessionModel).filter(
-                SessionModel.session_token == session_token,
-                SessionModel.is_active == True,
-                SessionModel.expires_at > now,
-            ).first()
+            # Find active session and its (active) user in one round trip
+            result = await db.execute(
+                select(SessionModel, User)
+                .join(User, User.id == SessionModel.user_id)
+                .where(
+                    SessionModel.session_token == token_hash,
+                    SessionModel.is_active == True,
+                    SessionModel.expires_at > now,
+                    User.is_active == True,
+                )
+                .limit(1)
+            )
+            row = result.first()
             
-            if not session:
+            if not row:
                 return None
             
+            session, user = row
+            
             # Check inactivity expiry
-            inactivity_expires_at = session.last_activity_at + timedelta(hours=SESSION_EXPIRY_HOURS)
+            inactivity_expires_at = as_utc(session.last_activity_at) + timedelta(hours=SESSION_EXPIRY_HOURS)
             if now > inactivity_expires_at:
-                logger.info(f"Session expired due to inactivity: {session_token[:8]}...")
+                logger.info(f"Session expired due to inactivity: {session.id}")
                 session.is_active = False
-                db.commit()
-                return None
-            
-            # Get user info
-            user = db.query(User).filter(User.id == session.user_id).first()
-            if not user or not user.is_active:
+                await db.commit()
                 return None
             
-            return {
+            info = {
                 "user_id": user.id,
                 "username": user.username,
                 "role": user.role,
                 "session_id": session.id,
             }
             
+            # Cache deadline on the monotonic clock, reusing this lookup's `now`
+            remaining = min(as_utc(session.expires_at), inactivity_expires_at) - now
+            valid_until = time.monotonic() + remaining.total_seconds()
+            with _session_cache_lock:
+                _session_cache[token_hash] = (valid_until, dict(info), as_utc(session.last_activity_at))
+                hashes = {key for key in _user_session_hashes.get(user.id, ()) if key in _session_cache}
+                hashes.add(token_hash)
+                _user_session_hashes[user.id] = hashes
+            
+            return info
+            
         except SQLAlchemyError as e:
             logger.error(f"Database error getting session: {e}")
             return None
@@ -121,46 +174,59 @@ class SessionService:
             logger.error(f"Error getting session: {e}")
             return None
         finally:
-            db.close()
+            await db.close()
     
     @staticmethod
-    def update_session_activity(session_token: str) -> bool:
+    async def update_session_activity(token_hash: str) -> None:
         """
         Update last activity time for a session.
         
+        Inactivity expiry is measured in hours, so activity is written at most
+        once per SESSION_ACTIVITY_UPDATE_INTERVAL; within that window a session
+        cached by get_session() returns without touching the database.
+        
         Args:
-            session_token: Session token
-            
-        Returns:
-            True if updated, False if session not found
+            token_hash: hash_token() of the session token, as used for get_session()
         """
-        db: Session = get_db_session()
+        now = datetime.now(timezone.utc)
+        with _session_cache_lock:
+            cached = _session_cache.get(token_hash)
+        if cached is not None and (now - cached[2]).total_seconds() < SESSION_ACTIVITY_UPDATE_INTERVAL:
+            return
+        
+        db: AsyncSession = get_async_db_session()
         try:
-            session = db.query(SessionModel).filter(
-                SessionModel.session_token == session_token,
-                SessionModel.is_active == True,
-            ).first()
-            
-            if not session:
-                return False
+            # Single conditional write; no row is read back. No matching row
+            # means another worker recorded activity within the interval (or
+            # the session is gone), so either way the cached time moves to now
+            # and this worker doesn't retry the write on every request.
+            await db.execute(
+                update(SessionModel)
+                .where(
+                    SessionModel.session_token == token_hash,
+                    SessionModel.is_active == True,
+                    SessionModel.last_activity_at < now - timedelta(seconds=SESSION_ACTIVITY_UPDATE_INTERVAL),
+                )
+                .values(last_activity_at=now)
+            )
+            await db.commit()
             
-            session.last_activity_at = datetime.now(timezone.utc)
-            db.commit()
-            return True
+            with _session_cache_lock:
+                cached = _session_cache.get(token_hash)
+                if cached is not None:
+                    _session_cache[token_hash] = (cached[0], cached[1], now)
             
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error updating session activity: {e}")
-            return False
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Error updating session activity: {e}")
-            return False
         finally:
-            db.close()
+            await db.close()
     
     @staticmethod
-    def invalidate_session(session_token: str) -> bool:
+    async def invalidate_session(session_token: str) -> bool:
         """
         Invalidate a session (logout).
         
@@ -170,58 +236,79 @@ class SessionService:
         Returns:
             True if invalidated, False if session not found
         """
-        db: Session = get_db_session()
+        token_hash = hash_token(session_token)
+        db: AsyncSession = get_async_db_session()
         try:
-            session = db.query(SessionModel).filter(
-                SessionModel.session_token == session_token,
-                SessionModel.is_active == True,
-            ).first()
+            result = await db.execute(
+                select(SessionModel).where(
+                    SessionModel.session_token == token_hash,
+                    SessionModel.is_active == True,
+                ).limit(1)
+            )
+            session = result.scalars().first()
             
             if not session:
                 return False
             
             session.is_active = False
-            db.commit()
+            await db.commit()
             
-            logger.info(f"Invalidated session: {session_token[:8]}...")
+            with _session_cache_lock:
+                _session_cache.pop(token_hash, None)
+            
+            logger.info(f"Invalidated session: {session.id}")
             return True
             
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error invalidating session: {e}")
             return False
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Error invalidating session: {e}")
             return False
         finally:
-            db.close()
+            await db.close()
+    
+    @staticmethod
+    def invalidate_cached_sessions(user_id: int):
+        """
+        Drop cached sessions for a user so the next lookup re-checks the database.
+        
+        Call after changes that affect session validity or contents
+        (deactivation, role change, deletion, password change).
+        
+        Args:
+            user_id: User ID
+        """
+        with _session_cache_lock:
+            for key in _user_session_hashes.pop(user_id, ()):
+                _session_cache.pop(key, None)
     
     @staticmethod
-    def cleanup_expired_sessions() -> int:
+    async def cleanup_expired_sessions() -> int:
         """
         Remove expired sessions from database.
         
         Returns:
             Number of sessions cleaned up
         """
-        db: Session = get_db_session()
+        db: AsyncSession = get_async_db_session()
         try:
             now = datetime.now(timezone.utc)
             
-            # Find expired sessions
-            expired_sessions = db.query(SessionModel).filter(
-                SessionModel.is_active == True,
-                SessionModel.expires_at <= now,
-            ).all()
-            
-            count = len(expired_sessions)
-            
-            # Mark as inactive
-            for session in expired_sessions:
-                session.is_active = False
+            # Mark expired sessions inactive in a single statement
+            result = await db.execute(
+                update(SessionModel)
+                .where(
+                    SessionModel.is_active == True,
+                    SessionModel.expires_at <= now,
+                )
+                .values(is_active=False)
+            )
+            count = result.rowcount
             
-            db.commit()
+            await db.commit()
             
             if count > 0:
                 logger.info(f"Cleaned up {count} expired sessions")
@@ -229,13 +316,13 @@ class SessionService:
             return count
             
         except SQLAlchemyError as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Database error cleaning up sessions: {e}")
             return 0
         except Exception as e:
-            db.rollback()
+            await db.rollback()
             logger.error(f"Error cleaning up sessions: {e}")
             return 0
         finally:
-            db.close()
+            await db.close()
 
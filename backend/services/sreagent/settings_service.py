@@ -1,82 +1,564 @@
 """Settings service for managing model configuration."""
 
 import os
+import asyncio
+import atexit
+import hashlib
 import logging
-from typing import Optional, Dict, Any
+import threading
+from operator import attrgetter
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import orjson
+from cachetools import TTLCache
 from cryptography.fernet import Fernet
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
 from .database import get_db_session
 from .models import ModelSettings
 
-# Import LiteLLM for API key validation
+# HTTP client for OpenAI validation and model listing
 try:
-    from google.adk.models.lite_llm import LiteLlm
+    import httpx
 except ImportError:
-    LiteLlm = None
+    httpx = None
+
+# HTTP/2 support for the HTTP clients, if h2 is installed
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
 
 logger = logging.getLogger(__name__)
 
 # Encryption key for API keys (should be stored in K8s secret)
 ENCRYPTION_KEY = os.getenv("ENCRYPTION_KEY", None)
-if ENCRYPTION_KEY:
-    # Use provided key (must be base64-encoded Fernet key)
-    try:
-        cipher_suite = Fernet(ENCRYPTION_KEY.encode())
-    except Exception as e:
-        logger.warning(f"Invalid encryption key format: {e}. Generating new key.")
-        ENCRYPTION_KEY = None
 
-if not ENCRYPTION_KEY:
+
+_cipher: Optional[Fernet] = None
+_cipher_lock = threading.Lock()
+
+
+def _get_cipher() -> Fernet:
+    """Return the Fernet cipher for API keys, building it on first use."""
+    global _cipher
+    if _cipher is None:
+        with _cipher_lock:
+            if _cipher is None:
+                _cipher = _build_cipher()
+    return _cipher
+
+
+def _build_cipher() -> Fernet:
+    """
+    Build the Fernet cipher from ENCRYPTION_KEY.
+    
+    Falls back to a temporary per-process key when ENCRYPTION_KEY is unset
+    or invalid (development only).
+    """
+    if ENCRYPTION_KEY:
+        # Use provided key (must be base64-encoded Fernet key)
+        try:
+            return Fernet(ENCRYPTION_KEY.encode())
+        except Exception as e:
+            logger.warning(f"Invalid encryption key format: {e}. Generating new key.")
+    else:
+        logger.warning("ENCRYPTION_KEY not set. Generating temporary key. This should be set in production!")
+    
     # Generate a new key (for development only - should be set in production)
-    logger.warning("ENCRYPTION_KEY not set. Generating temporary key. This should be set in production!")
     key = Fernet.generate_key()
-    cipher_suite = Fernet(key)
     logger.warning(f"Generated encryption key: {key.decode()}. Set ENCRYPTION_KEY environment variable in production!")
+    return Fernet(key)
+
+# Model settings and the decrypted API key change only on admin updates, so keep
+# the last read in process under "settings" / "api_key". Cleared by
+# update_model_settings() and the agent reload endpoint; the TTL bounds how long
+# other worker processes can serve a value changed elsewhere.
+SETTINGS_CACHE_TTL = int(os.getenv("SETTINGS_CACHE_TTL", "30"))  # seconds
+_settings_cache: TTLCache = TTLCache(maxsize=2, ttl=SETTINGS_CACHE_TTL)
+_settings_cache_lock = threading.Lock()
+
+# Successful API key validations and model listings, keyed by
+# ("validate" | "models", sha256(provider|model|api_key)); the key itself is never stored.
+# Provider model lists change rarely, so listings are kept longer than validations.
+VALIDATION_CACHE_TTL = int(os.getenv("VALIDATION_CACHE_TTL", "60"))  # seconds
+MODEL_LIST_CACHE_TTL = int(os.getenv("MODEL_LIST_CACHE_TTL", "600"))  # seconds
+_validation_cache: TTLCache = TTLCache(maxsize=256, ttl=VALIDATION_CACHE_TTL)
+_model_list_cache: TTLCache = TTLCache(maxsize=64, ttl=MODEL_LIST_CACHE_TTL)
+_validation_cache_lock = threading.Lock()
+
+# OpenAI error messages for keys the API rejected (401/403), keyed by sha256(api_key),
+# so a wrong key being retried doesn't hit the API (and its rate limits) every time
+REJECTED_KEY_CACHE_TTL = int(os.getenv("REJECTED_KEY_CACHE_TTL", "30"))  # seconds
+_rejected_key_cache: TTLCache = TTLCache(maxsize=256, ttl=REJECTED_KEY_CACHE_TTL)
+
+
+def _validation_cache_key(kind: str, provider: str, model_name: str, api_key: str) -> tuple:
+    digest = hashlib.sha256(
+        f"{(provider or '').lower().strip()}|{model_name or ''}|{_clean_api_key(api_key)}".encode()
+    ).hexdigest()
+    return (kind, digest)
+
+# Invisible characters that sneak into pasted API keys: zero-width characters
+# are dropped and Unicode spaces become plain spaces (then stripped at the ends),
+# all in one str.translate pass
+_API_KEY_TRANSLATE_TABLE = str.maketrans({
+    **{c: None for c in (0x200b, 0x200c, 0x200d, 0xfeff)},
+    **{c: " " for c in (0x00a0, *range(0x2000, 0x200b), 0x202f, 0x205f, 0x3000)},
+})
+
+
+def _clean_api_key(api_key: str) -> str:
+    """Remove invisible characters and surrounding whitespace from a pasted API key."""
+    return api_key.translate(_API_KEY_TRANSLATE_TABLE).strip() if api_key else ""
+
+
+# Pooled HTTP client for provider API calls, so repeated validations and
+# model listings reuse keep-alive connections instead of a new TLS handshake
+# (a sync client for threadpool callers, an async one for the event loop)
+_http_client = None
+_http_client_lock = threading.Lock()
+_async_http_client = None
+
+
+def _http_client_options() -> Dict[str, Any]:
+    """
+    Connection settings shared by the sync and async clients.
+    
+    Raises:
+        ImportError: If httpx is not installed
+    """
+    if httpx is None:
+        raise ImportError("httpx is not installed")
+    return {
+        "timeout": httpx.Timeout(10.0),
+        # Keep idle connections warm between an admin's validate, list and save calls
+        "limits": httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=30.0),
+        "http2": HTTP2_AVAILABLE,
+    }
+
+
+def _get_http_client():
+    """
+    Return the shared httpx client, creating it on first use.
+    
+    Raises:
+        ImportError: If httpx is not installed
+    """
+    global _http_client
+    if _http_client is not None:
+        return _http_client
+    
+    options = _http_client_options()
+    with _http_client_lock:
+        if _http_client is None:
+            _http_client = httpx.Client(**options)
+            atexit.register(_http_client.close)
+    return _http_client
+
+
+def _get_async_http_client():
+    """
+    Return the shared httpx async client, creating it on first use.
+    
+    Must be called from the event loop that will use it.
+    
+    Raises:
+        ImportError: If httpx is not installed
+    """
+    global _async_http_client
+    if _async_http_client is None:
+        _async_http_client = httpx.AsyncClient(**_http_client_options())
+    return _async_http_client
+
+
+async def close_async_http_client():
+    """Close the shared async HTTP client (call on application shutdown)."""
+    global _async_http_client
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+
+
+OPENAI_MODELS_URL = "https://api.openai.com/v1/models"
+GEMINI_MODELS_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+_GEMINI_PROBE_PARAMS = {"pageSize": 1}  # Smallest authenticated Gemini call
+# Models endpoints of other OpenAI-compatible providers, which take the key as
+# a bearer token. Providers with no such endpoint here can't be validated.
+PROVIDER_MODELS_URLS = {
+    "mistral": "https://api.mistral.ai/v1/models",
+    "groq": "https://api.groq.com/openai/v1/models",
+    "deepseek": "https://api.deepseek.com/models",
+    "together_ai": "https://api.together.xyz/v1/models",
+}
+
+# Public ModelSettings columns, fetched in one call
+_SETTINGS_FIELDS = attrgetter(
+    "model_provider", "model_name", "max_tokens", "temperature", "updated_at", "updated_by"
+)
+
+# Read-only settings queries select plain column rows (there is a single
+# settings row, id 1) instead of loading ORM objects into the session
+_PUBLIC_SETTINGS_COLUMNS = (
+    ModelSettings.model_provider,
+    ModelSettings.model_name,
+    ModelSettings.max_tokens,
+    ModelSettings.temperature,
+    ModelSettings.updated_at,
+    ModelSettings.updated_by,
+)
+_SETTINGS_QUERY = select(*_PUBLIC_SETTINGS_COLUMNS).where(ModelSettings.id == 1)
+_API_KEY_QUERY = select(ModelSettings.api_key).where(ModelSettings.id == 1)
+_SETTINGS_WITH_KEY_QUERY = select(*_PUBLIC_SETTINGS_COLUMNS, ModelSettings.api_key).where(ModelSettings.id == 1)
+
+# Fixed model lists for providers without a model listing call here. Model
+# lists are returned as tuples, so they can be shared without copying.
+GEMINI_MODELS = (
+    "gemini-2.0-flash",
+    "gemini-1.5-pro",
+    "gemini-1.5-flash",
+    "gemini-pro",
+)
+ANTHROPIC_MODELS = (
+    "claude-3-opus-20240229",
+    "claude-3-sonnet-20240229",
+    "claude-3-haiku-20240307",
+    "claude-3-5-sonnet-20240620",
+    "claude-3-5-haiku-20241022",
+)
+
+
+def _api_error_message(response, api_name: str) -> str:
+    """Best-effort error message from a failed provider API response."""
+    error_msg = f"{api_name} API returned {response.status_code}"
+    try:
+        error_data = response.json()
+        if "error" in error_data:
+            error_msg = error_data["error"].get("message", error_msg)
+    except Exception:
+        error_msg = f"{error_msg}: {response.text[:200]}"
+    return error_msg
+
+
+def _rejected_openai_key(api_key: str) -> Optional[str]:
+    """Error message from a recent OpenAI rejection of this key, if any."""
+    digest = hashlib.sha256(api_key.encode()).hexdigest()
+    with _validation_cache_lock:
+        return _rejected_key_cache.get(digest)
+
+
+def _openai_failure(api_key: str, error, log_prefix: str) -> str:
+    """
+    Handle a failed OpenAI API response: log it and return its error message.
+    
+    Authentication failures (401/403) are remembered for REJECTED_KEY_CACHE_TTL seconds.
+    """
+    error_msg = _api_error_message(error.response, "OpenAI")
+    if error.response.status_code in (401, 403):
+        digest = hashlib.sha256(api_key.encode()).hexdigest()
+        with _validation_cache_lock:
+            _rejected_key_cache[digest] = error_msg
+    logger.error(f"{log_prefix}: {error_msg}")
+    return error_msg
+
+
+def _validate_openai(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+    """
+    Validate an OpenAI API key against the models endpoint.
+    
+    Only authentication matters here, so a HEAD request is tried first to
+    skip downloading the model list. If HEAD fails (rejected key, or HEAD not
+    allowed) the GET is made instead, for a definitive answer with an error body.
+    """
+    client = _get_http_client()
+    rejected = _rejected_openai_key(api_key)
+    if rejected is not None:
+        return {"valid": False, "message": f"API key validation failed: {rejected}"}
+    
+    headers = {"Authorization": f"Bearer {api_key}"}
+    try:
+        response = client.head(OPENAI_MODELS_URL, headers=headers)
+        if response.is_error:
+            response = client.get(OPENAI_MODELS_URL, headers=headers)
+        response.raise_for_status()
+        return {"valid": True, "message": "API key validation successful"}
+    except httpx.HTTPStatusError as e:
+        error_msg = _openai_failure(api_key, e, "OpenAI API key validation failed")
+        return {"valid": False, "message": f"API key validation failed: {error_msg}"}
+    except httpx.RequestError as e:
+        logger.error(f"OpenAI API request error: {e}")
+        return {"valid": False, "message": f"Network error connecting to OpenAI API: {str(e)}"}
+
+
+async def _validate_openai_async(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+    """Async version of _validate_openai, on the shared async client."""
+    client = _get_async_http_client()
+    rejected = _rejected_openai_key(api_key)
+    if rejected is not None:
+        return {"valid": False, "message": f"API key validation failed: {rejected}"}
+    
+    headers = {"Authorization": f"Bearer {api_key}"}
+    try:
+        response = await client.head(OPENAI_MODELS_URL, headers=headers)
+        if response.is_error:
+            response = await client.get(OPENAI_MODELS_URL, headers=headers)
+        response.raise_for_status()
+        return {"valid": True, "message": "API key validation successful"}
+    except httpx.HTTPStatusError as e:
+        error_msg = _openai_failure(api_key, e, "OpenAI API key validation failed")
+        return {"valid": False, "message": f"API key validation failed: {error_msg}"}
+    except httpx.RequestError as e:
+        logger.error(f"OpenAI API request error: {e}")
+        return {"valid": False, "message": f"Network error connecting to OpenAI API: {str(e)}"}
+
+
+def _validate_gemini(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+    """
+    Validate a Gemini API key by listing a single model over the REST API.
+    
+    The key goes in the x-goog-api-key header rather than the URL, so it
+    stays out of request logs.
+    """
+    client = _get_http_client()
+    try:
+        response = client.get(GEMINI_MODELS_URL, params=_GEMINI_PROBE_PARAMS, headers={"x-goog-api-key": api_key})
+    except httpx.RequestError as e:
+        logger.error(f"Gemini API request error: {e}")
+        return {"valid": False, "message": f"Network error connecting to Gemini API: {str(e)}"}
+    return _gemini_validation_result(response)
+
+
+async def _validate_gemini_async(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+    """Async version of _validate_gemini, on the shared async client."""
+    client = _get_async_http_client()
+    try:
+        response = await client.get(GEMINI_MODELS_URL, params=_GEMINI_PROBE_PARAMS, headers={"x-goog-api-key": api_key})
+    except httpx.RequestError as e:
+        logger.error(f"Gemini API request error: {e}")
+        return {"valid": False, "message": f"Network error connecting to Gemini API: {str(e)}"}
+    return _gemini_validation_result(response)
+
+
+def _gemini_validation_result(response) -> Dict[str, Any]:
+    """Validation result from a Gemini model list response."""
+    if response.is_error:
+        error_msg = _api_error_message(response, "Gemini")
+        logger.error(f"Gemini API key validation failed: {error_msg}")
+        return {"valid": False, "message": f"API key validation failed: {error_msg}"}
+    return {"valid": True, "message": "API key validation successful"}
+
+
+def _validate_anthropic(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+    """
+    Validate an Anthropic API key.
+    
+    Anthropic can't easily be tested without a completion call, so this is a
+    format check only.
+    """
+    if not api_key.startswith("sk-ant-"):
+        return {"valid": False, "message": "Invalid Anthropic API key format (must start with 'sk-ant-')"}
+    return {"valid": True, "message": "API key format validated (format check only)"}
+
+
+def _validate_models_endpoint(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+    """Validate a key for a provider in PROVIDER_MODELS_URLS with one GET of its models endpoint."""
+    client = _get_http_client()
+    try:
+        response = client.get(PROVIDER_MODELS_URLS[provider], headers={"Authorization": f"Bearer {api_key}"})
+    except httpx.RequestError as e:
+        logger.error(f"{provider} API request error: {e}")
+        return {"valid": False, "message": f"Network error connecting to {provider} API: {str(e)}"}
+    return _models_endpoint_result(provider, response)
+
+
+async def _validate_models_endpoint_async(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+    """Async version of _validate_models_endpoint, on the shared async client."""
+    client = _get_async_http_client()
+    try:
+        response = await client.get(PROVIDER_MODELS_URLS[provider], headers={"Authorization": f"Bearer {api_key}"})
+    except httpx.RequestError as e:
+        logger.error(f"{provider} API request error: {e}")
+        return {"valid": False, "message": f"Network error connecting to {provider} API: {str(e)}"}
+    return _models_endpoint_result(provider, response)
+
+
+def _models_endpoint_result(provider: str, response) -> Dict[str, Any]:
+    """Validation result from a provider models endpoint response."""
+    if response.is_error:
+        error_msg = _api_error_message(response, provider)
+        logger.error(f"{provider} API key validation failed: {error_msg}")
+        return {"valid": False, "message": f"API key validation failed: {error_msg}"}
+    return {"valid": True, "message": "API key validation successful"}
+
+
+def _validate_unsupported(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+    """Result for providers without a models endpoint to probe."""
+    return {"valid": False, "message": f"Provider '{provider}' not supported for validation"}
+
+
+def _list_openai_models(api_key: str) -> Dict[str, Any]:
+    """List OpenAI chat models (gpt-*) available to the key."""
+    client = _get_http_client()
+    rejected = _rejected_openai_key(api_key)
+    if rejected is not None:
+        return {"success": False, "models": [], "message": f"Failed to fetch models from OpenAI: {rejected}"}
+    
+    try:
+        response = client.get(OPENAI_MODELS_URL, headers={"Authorization": f"Bearer {api_key}"})
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        error_msg = _openai_failure(api_key, e, "OpenAI API error")
+        return {"success": False, "models": [], "message": f"Failed to fetch models from OpenAI: {error_msg}"}
+    except httpx.RequestError as e:
+        logger.error(f"OpenAI API request error: {e}")
+        return {"success": False, "models": [], "message": f"Network error connecting to OpenAI API: {str(e)}"}
+    
+    return _openai_models_result(response)
+
+
+async def _list_openai_models_async(api_key: str) -> Dict[str, Any]:
+    """Async version of _list_openai_models, on the shared async client."""
+    client = _get_async_http_client()
+    rejected = _rejected_openai_key(api_key)
+    if rejected is not None:
+        return {"success": False, "models": [], "message": f"Failed to fetch models from OpenAI: {rejected}"}
+    
+    try:
+        response = await client.get(OPENAI_MODELS_URL, headers={"Authorization": f"Bearer {api_key}"})
+        response.raise_for_status()
+    except httpx.HTTPStatusError as e:
+        error_msg = _openai_failure(api_key, e, "OpenAI API error")
+        return {"success": False, "models": [], "message": f"Failed to fetch models from OpenAI: {error_msg}"}
+    except httpx.RequestError as e:
+        logger.error(f"OpenAI API request error: {e}")
+        return {"success": False, "models": [], "message": f"Network error connecting to OpenAI API: {str(e)}"}
+    
+    return _openai_models_result(response)
+
+
+def _openai_models_result(response) -> Dict[str, Any]:
+    """Model listing result from a successful /v1/models response."""
+    models = tuple(sorted({
+        model["id"]
+        for model in orjson.loads(response.content).get("data", [])
+        if model["id"].startswith("gpt-") and "inference" not in model["id"]
+    }))
+    if not models:
+        return {"success": False, "models": [], "message": "No GPT models found in API response"}
+    return {"success": True, "models": models, "message": f"Found {len(models)} available models"}
+
+
+def _list_gemini_models(api_key: str) -> Dict[str, Any]:
+    """Return the fixed Gemini model list, after checking the key."""
+    return _gemini_models_result(_validate_gemini("gemini", "", api_key))
+
+
+async def _list_gemini_models_async(api_key: str) -> Dict[str, Any]:
+    """Async version of _list_gemini_models."""
+    return _gemini_models_result(await _validate_gemini_async("gemini", "", api_key))
+
+
+def _gemini_models_result(validation: Dict[str, Any]) -> Dict[str, Any]:
+    if not validation["valid"]:
+        return {"success": False, "models": [], "message": validation["message"]}
+    return {"success": True, "models": GEMINI_MODELS, "message": f"Found {len(GEMINI_MODELS)} available models"}
+
+
+def _list_anthropic_models(api_key: str) -> Dict[str, Any]:
+    """Return the fixed Anthropic model list if the key is well-formed."""
+    if not api_key.startswith("sk-ant-"):
+        return {"success": False, "models": [], "message": "Invalid Anthropic API key format (must start with 'sk-ant-')"}
+    return {"success": True, "models": ANTHROPIC_MODELS, "message": f"Found {len(ANTHROPIC_MODELS)} available models"}
+
+
+# Per-provider validators and model listers; unknown providers are
+# unsupported for both
+_VALIDATORS: Dict[str, Callable[[str, str, str], Dict[str, Any]]] = {
+    "openai": _validate_openai,
+    "gemini": _validate_gemini,
+    "anthropic": _validate_anthropic,
+    **dict.fromkeys(PROVIDER_MODELS_URLS, _validate_models_endpoint),
+}
+# Async variants for the event loop. Providers listed in _INLINE_PROVIDERS do
+# no I/O and are called directly
+_ASYNC_VALIDATORS: Dict[str, Callable[[str, str, str], Awaitable[Dict[str, Any]]]] = {
+    "openai": _validate_openai_async,
+    "gemini": _validate_gemini_async,
+    **dict.fromkeys(PROVIDER_MODELS_URLS, _validate_models_endpoint_async),
+}
+_ASYNC_MODEL_LISTERS: Dict[str, Callable[[str], Awaitable[Dict[str, Any]]]] = {
+    "openai": _list_openai_models_async,
+    "gemini": _list_gemini_models_async,
+}
+_INLINE_PROVIDERS = frozenset({"anthropic"})
+_MODEL_LISTERS: Dict[str, Callable[[str], Dict[str, Any]]] = {
+    "openai": _list_openai_models,
+    "gemini": _list_gemini_models,
+    "anthropic": _list_anthropic_models,
+}
 
 
 class SettingsService:
     """Service for managing model settings."""
     
     @staticmethod
-    def encrypt_api_key(api_key: str) -> str:
-        """Encrypt API key before storage."""
+    def encrypt_api_key(api_key: str) -> bytes:
+        """Encrypt API key before storage (Fernet token bytes, stored as-is)."""
         if not api_key:
-            return ""
-        encrypted = cipher_suite.encrypt(api_key.encode())
-        return encrypted.decode()
+            return b""
+        return _get_cipher().encrypt(api_key.encode())
     
     @staticmethod
-    def decrypt_api_key(encrypted_key: str) -> str:
+    def decrypt_api_key(encrypted_key: bytes) -> str:
         """Decrypt API key for use."""
         if not encrypted_key:
             return ""
         try:
-            decrypted = cipher_suite.decrypt(encrypted_key.encode())
-            return decrypted.decode()
+            return _get_cipher().decrypt(encrypted_key).decode()
         except Exception as e:
             logger.error(f"Failed to decrypt API key: {e}")
             raise ValueError("Failed to decrypt API key")
     
+    @staticmethod
+    def invalidate_settings_cache():
+        """Drop the cached model settings and API key so the next read hits the database."""
+        with _settings_cache_lock:
+            _settings_cache.clear()
+    
+    @staticmethod
+    def _settings_to_dict(settings) -> Dict[str, Any]:
+        """Public (non-secret) fields of a ModelSettings row or column row."""
+        provider, model_name, max_tokens, temperature, updated_at, updated_by = _SETTINGS_FIELDS(settings)
+        return {
+            "provider": provider,
+            "model_name": model_name,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "updated_at": updated_at.isoformat() if updated_at else None,
+            "updated_by": updated_by,
+        }
+    
     @staticmethod
     def get_model_settings() -> Optional[Dict[str, Any]]:
-        """Get current model settings from database."""
+        """Get current model settings (cached for SETTINGS_CACHE_TTL or until the next update)."""
+        with _settings_cache_lock:
+            cached = _settings_cache.get("settings")
+        if cached is not None:
+            return dict(cached)
+        
         try:
             db = get_db_session()
             try:
-                settings = db.query(ModelSettings).filter(ModelSettings.id == 1).first()
+                settings = db.execute(_SETTINGS_QUERY).first()
                 if not settings:
                     return None
                 
-                return {
-                    "provider": settings.model_provider,
-                    "model_name": settings.model_name,
-                    "max_tokens": settings.max_tokens,
-                    "temperature": settings.temperature,
-                    "updated_at": settings.updated_at.isoformat() if settings.updated_at else None,
-                    "updated_by": settings.updated_by,
-                }
+                result = SettingsService._settings_to_dict(settings)
+                with _settings_cache_lock:
+                    _settings_cache["settings"] = dict(result)
+                return result
             finally:
                 db.close()
         except SQLAlchemyError as e:
@@ -88,15 +570,23 @@ class SettingsService:
     
     @staticmethod
     def get_api_key() -> Optional[str]:
-        """Get decrypted API key from database."""
+        """Get decrypted API key from database (cached like the model settings)."""
+        with _settings_cache_lock:
+            cached = _settings_cache.get("api_key")
+        if cached is not None:
+            return cached
+        
         try:
             db = get_db_session()
             try:
-                settings = db.query(ModelSettings).filter(ModelSettings.id == 1).first()
+                settings = db.execute(_API_KEY_QUERY).first()
                 if not settings:
                     return None
                 
-                return SettingsService.decrypt_api_key(settings.api_key)
+                api_key = SettingsService.decrypt_api_key(settings.api_key)
+                with _settings_cache_lock:
+                    _settings_cache["api_key"] = api_key
+                return api_key
             finally:
                 db.close()
         except SQLAlchemyError as e:
@@ -106,154 +596,152 @@ class SettingsService:
             logger.error(f"Error getting API key: {e}")
             raise
     
+    @staticmethod
+    def _get_settings_with_key() -> Optional[Tuple[Dict[str, Any], str]]:
+        """
+        Get model settings and the decrypted API key together.
+        
+        Served from the settings cache when both are cached; otherwise one
+        query and one decrypt fill both cache entries.
+        
+        Returns:
+            (settings dict, API key), or None if no settings are saved
+        """
+        with _settings_cache_lock:
+            cached_settings = _settings_cache.get("settings")
+            cached_key = _settings_cache.get("api_key")
+        if cached_settings is not None and cached_key is not None:
+            return dict(cached_settings), cached_key
+        
+        try:
+            db = get_db_session()
+            try:
+                settings = db.execute(_SETTINGS_WITH_KEY_QUERY).first()
+                if not settings:
+                    return None
+                
+                result = SettingsService._settings_to_dict(settings)
+                api_key = SettingsService.decrypt_api_key(settings.api_key)
+                with _settings_cache_lock:
+                    _settings_cache["settings"] = dict(result)
+                    _settings_cache["api_key"] = api_key
+                return result, api_key
+            finally:
+                db.close()
+        except SQLAlchemyError as e:
+            logger.error(f"Database error getting model settings: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Error getting model settings: {e}")
+            raise
+    
     @staticmethod
     def validate_api_key(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
         """
-        Validate API key by making a test call to the model API.
+        Validate API key, reusing a recent successful result for the same inputs.
+        
+        Only successful validations are remembered, for VALIDATION_CACHE_TTL seconds,
+        so a "validate" followed by "save" makes a single provider call.
         
         Returns:
             Dict with 'valid' (bool) and 'message' (str)
         """
-        # Normalize provider to lowercase
-        provider = provider.lower().strip() if provider else ""
+        cache_key = _validation_cache_key("validate", provider, model_name, api_key)
+        with _validation_cache_lock:
+            cached = _validation_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        result = SettingsService._validate_api_key(provider, model_name, api_key)
+        if result.get("valid"):
+            with _validation_cache_lock:
+                _validation_cache[cache_key] = dict(result)
+        return result
+    
+    @staticmethod
+    async def validate_api_key_async(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+        """
+        Async version of validate_api_key, for callers on the event loop.
         
+        Shares the validation cache with validate_api_key.
+        
+        Returns:
+            Dict with 'valid' (bool) and 'message' (str)
+        """
+        cache_key = _validation_cache_key("validate", provider, model_name, api_key)
+        with _validation_cache_lock:
+            cached = _validation_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        result = await SettingsService._validate_api_key_async(provider, model_name, api_key)
+        if result.get("valid"):
+            with _validation_cache_lock:
+                _validation_cache[cache_key] = dict(result)
+        return result
+    
+    @staticmethod
+    def _prepare_validation(provider: str, api_key: str) -> Tuple[str, str, Optional[Dict[str, Any]]]:
+        """
+        Normalize provider and key for validation.
+        
+        Returns:
+            (provider, api_key, error) where error is a failed result dict, or None
+        """
+        provider = provider.lower().strip() if provider else ""
         if not provider:
+            return provider, "", {"valid": False, "message": "Provider is required"}
+        
+        api_key = _clean_api_key(api_key)
+        if not api_key:
+            return provider, api_key, {"valid": False, "message": "API key is required"}
+        
+        return provider, api_key, None
+    
+    @staticmethod
+    def _validate_api_key(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+        """
+        Validate API key by making a test call to the model API.
+        
+        Returns:
+            Dict with 'valid' (bool) and 'message' (str)
+        """
+        provider, api_key, error = SettingsService._prepare_validation(provider, api_key)
+        if error:
+            return error
+        
+        try:
+            validator = _VALIDATORS.get(provider, _validate_unsupported)
+            return validator(provider, model_name, api_key)
+        except ImportError:
+            logger.error("httpx not available for API key validation")
             return {
                 "valid": False,
-                "message": "Provider is required"
+                "message": "Validation not available (httpx not installed)"
             }
-        
-        if not api_key or not api_key.strip():
+        except Exception as e:
+            logger.error(f"Error validating API key: {e}", exc_info=True)
             return {
                 "valid": False,
-                "message": "API key is required"
+                "message": f"API key validation failed: {str(e)}"
             }
-        
-        api_key = api_key.strip()
+    
+    @staticmethod
+    async def _validate_api_key_async(provider: str, model_name: str, api_key: str) -> Dict[str, Any]:
+        """Async version of _validate_api_key; checks that do no I/O run inline."""
+        provider, api_key, error = SettingsService._prepare_validation(provider, api_key)
+        if error:
+            return error
         
         try:
-            import httpx
-            
-            if provider == "openai":
-                # Validate OpenAI API key by calling the models endpoint
-                headers = {"Authorization": f"Bearer {api_key}"}
-                try:
-                    response = httpx.get("https://api.openai.com/v1/models", headers=headers, timeout=10.0)
-                    response.raise_for_status()
-                    
-                    # If we get here, the API key is valid
-                    return {
-                        "valid": True,
-                        "message": "API key validation successful"
-                    }
-                except httpx.HTTPStatusError as e:
-                    error_msg = f"OpenAI API returned {e.response.status_code}"
-                    try:
-                        error_data = e.response.json()
-                        if "error" in error_data:
-                            error_msg = error_data["error"].get("message", error_msg)
-                    except:
-                        error_msg = f"{error_msg}: {e.response.text[:200]}"
-                    logger.error(f"OpenAI API key validation failed: {error_msg}")
-                    return {
-                        "valid": False,
-                        "message": f"API key validation failed: {error_msg}"
-                    }
-                except httpx.RequestError as e:
-                    logger.error(f"OpenAI API request error: {e}")
-                    return {
-                        "valid": False,
-                        "message": f"Network error connecting to OpenAI API: {str(e)}"
-                    }
-            
-            elif provider == "gemini":
-                # Validate Gemini API key by trying to list models
-                try:
-                    import google.generativeai as genai
-                    genai.configure(api_key=api_key)
-                    # Try to list models (this will fail if key is invalid)
-                    list(genai.list_models())
-                    return {
-                        "valid": True,
-                        "message": "API key validation successful"
-                    }
-                except ImportError:
-                    return {
-                        "valid": False,
-                        "message": "Google Generative AI library not available"
-                    }
-                except Exception as e:
-                    logger.error(f"Gemini API key validation failed: {e}")
-                    return {
-                        "valid": False,
-                        "message": f"API key validation failed: {str(e)}"
-                    }
-            
-            elif provider == "anthropic":
-                # Validate Anthropic API key format and make a minimal test call
-                if not api_key.startswith("sk-ant-"):
-                    return {
-                        "valid": False,
-                        "message": "Invalid Anthropic API key format (must start with 'sk-ant-')"
-                    }
-                
-                # For Anthropic, we can't easily test without making a completion call
-                # So we'll just validate the format for now
-                # In production, you might want to make a minimal completion call
-                return {
-                    "valid": True,
-                    "message": "API key format validated (format check only)"
-                }
-            
-            else:
-                # For other providers, try using LiteLLM if available
-                if not LiteLlm:
-                    return {
-                        "valid": False,
-                        "message": f"Provider '{provider}' not supported for validation"
-                    }
-                
-                try:
-                    # Build model string
-                    if "/" in model_name:
-                        model = model_name
-                    else:
-                        model = f"{provider}/{model_name}"
-                    
-                    # Create LiteLLM instance and make a minimal test call
-                    lite_llm_kwargs = {
-                        "model": model,
-                        "api_key": api_key,
-                    }
-                    
-                    test_model = LiteLlm(**lite_llm_kwargs)
-                    
-                    # Try to make a minimal completion call
-                    # This will actually validate the key
-                    try:
-                        # Make a very small test call
-                        response = test_model.complete(
-                            prompt="test",
-                            max_tokens=1,
-                            temperature=0
-                        )
-                        return {
-                            "valid": True,
-                            "message": "API key validation successful"
-                        }
-                    except Exception as e:
-                        logger.error(f"LiteLLM test call failed: {e}")
-                        return {
-                            "valid": False,
-                            "message": f"API key validation failed: {str(e)}"
-                        }
-                except Exception as e:
-                    logger.error(f"LiteLLM validation failed: {e}")
-                    return {
-                        "valid": False,
-                        "message": f"API key validation failed: {str(e)}"
-                    }
+            async_validator = _ASYNC_VALIDATORS.get(provider)
+            if async_validator is not None:
+                return await async_validator(provider, model_name, api_key)
             
+            validator = _VALIDATORS.get(provider, _validate_unsupported)
+            if provider in _INLINE_PROVIDERS or validator is _validate_unsupported:
+                return validator(provider, model_name, api_key)
+            return await asyncio.to_thread(validator, provider, model_name, api_key)
         except ImportError:
             logger.error("httpx not available for API key validation")
             return {
@@ -269,137 +757,107 @@ class SettingsService:
     
     @staticmethod
     def list_available_models(provider: str, api_key: str) -> Dict[str, Any]:
+        """
+        List available models, reusing a recent successful result for the same inputs.
+        
+        Successful listings are remembered for MODEL_LIST_CACHE_TTL seconds, so
+        repeat listings with one key skip the provider call.
+        
+        Returns:
+            Dict with 'success' (bool), 'models' (list), and 'message' (str)
+        """
+        cache_key = _validation_cache_key("models", provider, "", api_key)
+        with _validation_cache_lock:
+            cached = _model_list_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        result = SettingsService._list_available_models(provider, api_key)
+        if result.get("success"):
+            with _validation_cache_lock:
+                _model_list_cache[cache_key] = dict(result)
+        return result
+    
+    @staticmethod
+    def _list_available_models(provider: str, api_key: str) -> Dict[str, Any]:
         """
         List available models for a given provider using their API.
         
         Returns:
             Dict with 'success' (bool), 'models' (list), and 'message' (str)
         """
+        provider, api_key, error = SettingsService._prepare_validation(provider, api_key)
+        if error:
+            return {"success": False, "models": [], "message": error["message"]}
+        
         try:
-            import httpx
-            
-            # Normalize provider to lowercase for case-insensitive comparison
-            provider = provider.lower().strip() if provider else ""
-            
-            if not provider:
-                return {
-                    "success": False,
-                    "models": [],
-                    "message": "Provider is required"
-                }
-            
-            if not api_key or not api_key.strip():
+            lister = _MODEL_LISTERS.get(provider)
+            if lister is None:
                 return {
                     "success": False,
                     "models": [],
-                    "message": "API key is required"
+                    "message": f"Unsupported provider: {provider}"
                 }
+            return lister(api_key)
+        except ImportError:
+            logger.error("httpx not available for model listing")
+            return {
+                "success": False,
+                "models": [],
+                "message": "Model listing not available (httpx not installed)"
+            }
+        except Exception as e:
+            logger.error(f"Error listing models: {e}")
+            return {
+                "success": False,
+                "models": [],
+                "message": f"Failed to list models: {str(e)}"
+            }
+    
+    @staticmethod
+    async def list_available_models_async(provider: str, api_key: str) -> Dict[str, Any]:
+        """
+        Async version of list_available_models, for callers on the event loop.
+        
+        Shares the listing cache with list_available_models.
+        
+        Returns:
+            Dict with 'success' (bool), 'models' (list), and 'message' (str)
+        """
+        cache_key = _validation_cache_key("models", provider, "", api_key)
+        with _validation_cache_lock:
+            cached = _model_list_cache.get(cache_key)
+        if cached is not None:
+            return dict(cached)
+        
+        result = await SettingsService._list_available_models_async(provider, api_key)
+        if result.get("success"):
+            with _validation_cache_lock:
+                _model_list_cache[cache_key] = dict(result)
+        return result
+    
+    @staticmethod
+    async def _list_available_models_async(provider: str, api_key: str) -> Dict[str, Any]:
+        """Async version of _list_available_models; blocking SDK calls run in a worker thread."""
+        provider, api_key, error = SettingsService._prepare_validation(provider, api_key)
+        if error:
+            return {"success": False, "models": [], "message": error["message"]}
+        
+        try:
+            async_lister = _ASYNC_MODEL_LISTERS.get(provider)
+            if async_lister is not None:
+                return await async_lister(api_key)
             
-            models = []
-            
-            if provider == "openai":
-                # Use OpenAI API to list models
-                headers = {"Authorization": f"Bearer {api_key.strip()}"}
-                try:
-                    response = httpx.get("https://api.openai.com/v1/models", headers=headers, timeout=10.0)
-                    response.raise_for_status()  # Raise exception for non-200 status codes
-                    
-                    data = response.json()
-                    # Filter for chat models (gpt-*)
-                    models = [
-                        model["id"] 
-                        for model in data.get("data", [])
-                        if model["id"].startswith("gpt-") and "inference" not in model.get("id", "")
-                    ]
-                    # Remove duplicates and sort
-                    models = sorted(list(set(models)))
-                    
-                    if not models:
-                        return {
-                            "success": False,
-                            "models": [],
-                            "message": "No GPT models found in API response"
-                        }
-                except httpx.HTTPStatusError as e:
-                    error_msg = f"OpenAI API returned {e.response.status_code}"
-                    try:
-                        error_data = e.response.json()
-                        if "error" in error_data:
-                            error_msg = error_data["error"].get("message", error_msg)
-                    except:
-                        error_msg = f"{error_msg}: {e.response.text[:200]}"
-                    logger.error(f"OpenAI API error: {error_msg}")
-                    return {
-                        "success": False,
-                        "models": [],
-                        "message": f"Failed to fetch models from OpenAI: {error_msg}"
-                    }
-                except httpx.RequestError as e:
-                    logger.error(f"OpenAI API request error: {e}")
-                    return {
-                        "success": False,
-                        "models": [],
-                        "message": f"Network error connecting to OpenAI API: {str(e)}"
-                    }
-            
-            elif provider == "gemini":
-                # Gemini models are fixed - return common ones
-                models = [
-                    "gemini-2.0-flash",
-                    "gemini-1.5-pro",
-                    "gemini-1.5-flash",
-                    "gemini-pro",
-                ]
-                # Try to validate the key by making a simple request
-                try:
-                    import google.generativeai as genai
-                    genai.configure(api_key=api_key.strip())
-                    # List models to validate key (this will fail if key is invalid)
-                    list(genai.list_models())
-                except ImportError:
-                    # If google.generativeai is not available, just return the models
-                    # The key will be validated when saving
-                    logger.warning("google.generativeai not available, skipping key validation")
-                    pass
-                except Exception as e:
-                    logger.error(f"Gemini API key validation failed: {e}")
-                    return {
-                        "success": False,
-                        "models": [],
-                        "message": f"API key validation failed: {str(e)}"
-                    }
-            
-            elif provider == "anthropic":
-                # Anthropic models are fixed - return common ones
-                models = [
-                    "claude-3-opus-20240229",
-                    "claude-3-sonnet-20240229",
-                    "claude-3-haiku-20240307",
-                    "claude-3-5-sonnet-20240620",
-                    "claude-3-5-haiku-20241022",
-                ]
-                # Validate key by checking if it's properly formatted
-                api_key_clean = api_key.strip()
-                if not api_key_clean.startswith("sk-ant-"):
-                    return {
-                        "success": False,
-                        "models": [],
-                        "message": "Invalid Anthropic API key format (must start with 'sk-ant-')"
-                    }
-            
-            else:
+            lister = _MODEL_LISTERS.get(provider)
+            if lister is None:
                 return {
                     "success": False,
                     "models": [],
                     "message": f"Unsupported provider: {provider}"
                 }
-            
-            return {
-                "success": True,
-                "models": models,
-                "message": f"Found {len(models)} available models"
-            }
-            
+            if provider in _INLINE_PROVIDERS:
+                return lister(api_key)
+            return await asyncio.to_thread(lister, api_key)
         except ImportError:
             logger.error("httpx not available for model listing")
             return {
@@ -424,16 +882,15 @@ class SettingsService:
             Dict with 'valid' (bool) and 'message' (str)
         """
         try:
-            # Get saved settings
-            settings = SettingsService.get_model_settings()
-            if not settings:
+            # Get saved settings and API key in one read
+            saved = SettingsService._get_settings_with_key()
+            if not saved:
                 return {
                     "valid": False,
                     "message": "No model configuration found. Please configure and save settings first."
                 }
+            settings, api_key = saved
             
-            # Get saved API key
-            api_key = SettingsService.get_api_key()
             if not api_key:
                 return {
                     "valid": False,
@@ -470,6 +927,26 @@ class SettingsService:
                 "message": f"Failed to test saved configuration: {str(e)}"
             }
     
+    @staticmethod
+    def _settings_unchanged(
+        settings: ModelSettings,
+        provider: str,
+        model_name: str,
+        api_key: str,
+        max_tokens: Optional[int],
+        temperature: Optional[float],
+    ) -> bool:
+        """Whether a stored settings row already holds these values."""
+        if (settings.model_provider, settings.model_name, settings.max_tokens, settings.temperature) != (
+            provider, model_name, max_tokens, temperature
+        ):
+            return False
+        try:
+            return SettingsService.decrypt_api_key(settings.api_key) == api_key
+        except ValueError:
+            # Unreadable stored key (e.g. ENCRYPTION_KEY changed): overwrite it
+            return False
+    
     @staticmethod
     def update_model_settings(
         provider: str,
@@ -496,11 +973,21 @@ class SettingsService:
         try:
             db = get_db_session()
             try:
-                # Encrypt API key
-                encrypted_key = SettingsService.encrypt_api_key(api_key)
+                # Store the API key normalized the same way it was validated
+                api_key = _clean_api_key(api_key)
                 
                 # Get or create settings
-                settings = db.query(ModelSettings).filter(ModelSettings.id == 1).first()
+                settings = db.get(ModelSettings, 1)
+                
+                # Saving unchanged settings is a no-op: skip the encrypt and the
+                # write (the key is only decrypted once the cheap fields match)
+                if settings and SettingsService._settings_unchanged(
+                    settings, provider, model_name, api_key, max_tokens, temperature
+                ):
+                    logger.info(f"Model settings unchanged: {provider}/{model_name}")
+                    return True
+                
+                encrypted_key = SettingsService.encrypt_api_key(api_key)
                 
                 if settings:
                     # Update existing
@@ -525,6 +1012,11 @@ class SettingsService:
                     db.add(settings)
                 
                 db.commit()
+                SettingsService.invalidate_settings_cache()
+                with _validation_cache_lock:
+                    _validation_cache.clear()
+                    _model_list_cache.clear()
+                    _rejected_key_cache.clear()
                 logger.info(f"Model settings updated: {provider}/{model_name}")
                 return True
                 
@@ -11,7 +11,7 @@ setup(
         "google-adk>=0.1.0",
         "google-genai>=0.1.0",
         "fastapi>=0.104.0",
-        "uvicorn[standard]>=0.24.0",
+        "uvicorn[standard]>=0.30.0",
         "pydantic>=2.0.0",
         "mcp>=0.9.0",
         "kubernetes>=28.0.0",
@@ -1,17 +1,21 @@
 """API token management service."""
 
+import os
 import logging
 from typing import Optional, List, Dict
 from datetime import datetime, timezone, timedelta
+from sqlalchemy import select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import SQLAlchemyError
 
 from .database import get_db_session
-from .models import ApiToken
-from .auth_utils import generate_token, hash_token
+from .models import ApiToken, User
+from .auth_utils import as_utc, generate_token, hash_token
 
 logger = logging.getLogger(__name__)
 
+TOKEN_LAST_USED_UPDATE_INTERVAL = int(os.getenv("TOKEN_LAST_USED_UPDATE_INTERVAL", "60"))  # seconds between last_used_at writes
+
 
 class TokenService:
     """Service for managing API tokens."""
@@ -83,9 +87,19 @@ class TokenService:
         """
         db: Session = get_db_session()
         try:
-            tokens = db.query(ApiToken).filter(
-                ApiToken.user_id == user_id
-            ).order_by(ApiToken.created_at.desc()).all()
+            # Only the listed columns, as plain rows rather than ORM objects
+            tokens = db.execute(
+                select(
+                    ApiToken.id,
+                    ApiToken.name,
+                    ApiToken.created_at,
+                    ApiToken.last_used_at,
+                    ApiToken.expires_at,
+                )
+                .where(ApiToken.user_id == user_id)
+                .order_by(ApiToken.created_at.desc())
+            ).all()
+            now = datetime.now(timezone.utc)
             
             return [
                 {
@@ -94,7 +108,7 @@ class TokenService:
                     "created_at": token.created_at.isoformat() if token.created_at else None,
                     "last_used_at": token.last_used_at.isoformat() if token.last_used_at else None,
                     "expires_at": token.expires_at.isoformat() if token.expires_at else None,
-                    "is_expired": token.expires_at is not None and token.expires_at < datetime.now(timezone.utc),
+                    "is_expired": token.expires_at is not None and as_utc(token.expires_at) < now,
                 }
                 for token in tokens
             ]
@@ -163,36 +177,41 @@ class TokenService:
             token_hash = hash_token(token)
             now = datetime.now(timezone.utc)
             
-            # Find token
-            api_token = db.query(ApiToken).filter(
-                ApiToken.token_hash == token_hash
+            # Find token and its (active) user in one round trip, by unique index
+            row = db.execute(
+                select(
+                    ApiToken.id.label("token_id"),
+                    ApiToken.expires_at,
+                    ApiToken.last_used_at,
+                    User.id.label("user_id"),
+                    User.username,
+                    User.role,
+                )
+                .join(User, User.id == ApiToken.user_id)
+                .where(ApiToken.token_hash == token_hash, User.is_active == True)
             ).first()
             
-            if not api_token:
+            if not row:
                 return None
             
             # Check expiration
-            if api_token.expires_at and api_token.expires_at < now:
-                logger.info(f"API token expired: {api_token.id}")
+            if row.expires_at and as_utc(row.expires_at) < now:
+                logger.info(f"API token expired: {row.token_id}")
                 return None
             
-            # Get user
-            from .models import User
-            user = db.query(User).filter(User.id == api_token.user_id).first()
-            if not user or not user.is_active:
-                return None
-            
-            # Update last used
-            api_token.last_used_at = now
-            db.commit()
+            # Update last used, skipping the write when the recorded use is recent
+            if row.last_used_at is None or (now - as_utc(row.last_used_at)).total_seconds() >= TOKEN_LAST_USED_UPDATE_INTERVAL:
+                db.execute(update(ApiToken).where(ApiToken.id == row.token_id).values(last_used_at=now))
+                db.commit()
             
             return {
-                "user_id": user.id,
-                "username": user.username,
-                "role": user.role,
+                "user_id": row.user_id,
+                "username": row.username,
+                "role": row.role,
             }
             
         except SQLAlchemyError as e:
+            db.rollback()
             logger.error(f"Database error verifying API token: {e}")
             return None
         except Exception as e:
@@ -200,37 +219,3 @@ class TokenService:
             return None
         finally:
             db.close()
-    
-    @staticmethod
-    def update_token_last_used(token_id: int) -> bool:
-        """
-        Update last used timestamp for a token.
-        
-        Args:
-            token_id: Token ID
-            
-        Returns:
-            True if updated, False if not found
-        """
-        db: Session = get_db_session()
-        try:
-            token = db.query(ApiToken).filter(ApiToken.id == token_id).first()
-            if not token:
-                return False
-            
-            token.last_used_at = datetime.now(timezone.utc)
-            db.commit()
-            
-            return True
-            
-        except SQLAlchemyError as e:
-            db.rollback()
-            logger.error(f"Database error updating token last used: {e}")
-            return False
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Error updating token last used: {e}")
-            return False
-        finally:
-            db.close()
-
@@ -0,0 +1,65 @@
+"""In-process TTL cache for user lookups."""
+
+import os
+import functools
+import threading
+from typing import Callable, Dict, Optional
+
+from cachetools import TTLCache
+
+# Cache configuration from environment
+USER_CACHE_MAXSIZE = int(os.getenv("USER_CACHE_MAXSIZE", "4096"))
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))  # seconds
+
+# Entries are keyed by user ID.
+# UserService methods are synchronous and run on the threadpool, so the
+# cache is guarded by a threading lock rather than an asyncio one.
+_user_cache: TTLCache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL)
+_user_cache_lock = threading.Lock()
+
+# Credential fields never kept in the cache
+_SENSITIVE_FIELDS = ("password_hash",)
+
+
+def cached_user_lookup(func: Callable[[int], Optional[Dict]]) -> Callable[[int], Optional[Dict]]:
+    """
+    Decorator memoizing a user lookup by ID.
+
+    Only successful lookups are cached; a None result always falls
+    through to the database so newly created users are visible at once.
+    Credential fields (password_hash) are stripped from every result,
+    cached or not, so lookups that need them must not use this decorator.
+
+    Args:
+        func: Lookup taking a user ID
+
+    Returns:
+        Wrapped lookup function
+    """
+    @functools.wraps(func)
+    def wrapper(user_id: int) -> Optional[Dict]:
+        with _user_cache_lock:
+            user = _user_cache.get(user_id)
+        if user is not None:
+            return dict(user)
+
+        user = func(user_id)
+        if user is None:
+            return None
+        public = {k: v for k, v in user.items() if k not in _SENSITIVE_FIELDS}
+        with _user_cache_lock:
+            _user_cache[user_id] = public
+        return dict(public)
+
+    return wrapper
+
+
+def invalidate_user(user_id: int) -> None:
+    """
+    Drop the cached entry for a user.
+
+    Args:
+        user_id: User ID
+    """
+    with _user_cache_lock:
+        _user_cache.pop(user_id, None)
@@ -3,19 +3,78 @@
 import logging
 from typing import Optional, List, Dict
 from datetime import datetime, timezone
+from sqlalchemy import bindparam, delete, select, update
 from sqlalchemy.orm import Session
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 
 from .database import get_db_session
-from .models import User
-from .auth_utils import hash_password, verify_password, validate_password
+from .models import ApiToken, Session as SessionModel, User
+from .auth_utils import as_utc, hash_password, verify_password, validate_password
+from .user_cache import cached_user_lookup, invalidate_user
+from .session_service import SessionService
 
 logger = logging.getLogger(__name__)
 
+# Hot statements built once; the engine's compiled-statement cache then reuses their SQL
+_USER_BY_USERNAME = select(User).where(User.username == bindparam("username")).limit(1)
+_UPDATE_LAST_LOGIN = update(User).where(User.id == bindparam("user_id")).values(last_login=bindparam("now"))
+_UPDATE_PASSWORD = (
+    update(User)
+    .where(User.id == bindparam("user_id"))
+    .values(password_hash=bindparam("new_hash"), updated_at=bindparam("now"))
+)
+_UPGRADE_PASSWORD_HASH = (
+    update(User)
+    .where(User.id == bindparam("user_id"), User.password_hash == bindparam("old_hash"))
+    .values(password_hash=bindparam("new_hash"))
+)
+_DELETE_USER_TOKENS = delete(ApiToken).where(ApiToken.user_id == bindparam("user_id"))
+_DELETE_USER_SESSIONS = delete(SessionModel).where(SessionModel.user_id == bindparam("user_id"))
+_DELETE_USER = delete(User).where(User.id == bindparam("user_id"))
+
+
+def _isoformat_utc(dt: Optional[datetime]) -> Optional[str]:
+    """
+    Format a timestamp as UTC-aware ISO 8601 ("...+00:00").
+    
+    Rows read back from the database are naive (stored as UTC), while freshly
+    flushed ones still hold the aware values they were created with.
+    """
+    if dt is None:
+        return None
+    return as_utc(dt).astimezone(timezone.utc).isoformat()
+
 
 class UserService:
     """Service for managing users."""
     
+    @staticmethod
+    def _user_to_dict(user: User, include_hash: bool = False) -> Dict:
+        """
+        Serialize a loaded User without going through instrumented attributes.
+        
+        Args:
+            user: User whose columns are loaded (fresh from a query or flush)
+            include_hash: Whether to include password_hash
+            
+        Returns:
+            Dict with user info
+        """
+        d = user.__dict__
+        # Unset nullable columns (e.g. last_login on a new user) are absent until loaded
+        result = {
+            "id": d["id"],
+            "username": d["username"],
+            "role": d["role"],
+            "is_active": d["is_active"],
+            "created_at": _isoformat_utc(d.get("created_at")),
+            "updated_at": _isoformat_utc(d.get("updated_at")),
+            "last_login": _isoformat_utc(d.get("last_login")),
+        }
+        if include_hash:
+            result["password_hash"] = d["password_hash"]
+        return result
+    
     @staticmethod
     def create_user(username: str, password: str, role: str = "user") -> Dict:
         """
@@ -43,55 +102,49 @@ class UserService:
         
         db: Session = get_db_session()
         try:
-            # Check if user already exists
-            existing_user = db.query(User).filter(User.username == username).first()
-            if existing_user:
-                raise ValueError(f"User '{username}' already exists")
-            
             # Hash password
             password_hash = hash_password(password)
             
-            # Create user
+            # Create user (one timestamp for both audit columns)
+            now = datetime.now(timezone.utc)
             user = User(
                 username=username,
                 password_hash=password_hash,
                 role=role,
                 is_active=True,
-                created_at=datetime.now(timezone.utc),
-                updated_at=datetime.now(timezone.utc),
+                created_at=now,
+                updated_at=now,
             )
             
+            # The unique username index rejects duplicates in the same round trip
             db.add(user)
+            db.flush()
+            
+            # Serialize before commit expires the attributes, instead of a refresh SELECT
+            result = UserService._user_to_dict(user)
             db.commit()
-            db.refresh(user)
             
             logger.info(f"Created user: {username} with role: {role}")
             
-            return {
-                "id": user.id,
-                "username": user.username,
-                "role": user.role,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "updated_at": user.updated_at.isoformat() if user.updated_at else None,
-                "last_login": user.last_login.isoformat() if user.last_login else None,
-            }
+            return result
             
+        except IntegrityError:
+            db.rollback()
+            raise ValueError(f"User '{username}' already exists")
         except SQLAlchemyError as e:
             db.rollback()
             logger.error(f"Database error creating user: {e}")
             raise ValueError(f"Failed to create user: {e}")
         except ValueError:
-            db.rollback()
             raise
         except Exception as e:
-            db.rollback()
             logger.error(f"Error creating user: {e}")
-            raise ValueError(f"Failed to create user: {e}")
+            raise ValueError(f"Failed to create user: {e}") from e
         finally:
             db.close()
     
     @staticmethod
+    @cached_user_lookup
     def get_user(user_id: int) -> Optional[Dict]:
         """
         Get user by ID.
@@ -104,19 +157,11 @@ class UserService:
         """
         db: Session = get_db_session()
         try:
-            user = db.query(User).filter(User.id == user_id).first()
+            user = db.get(User, user_id)
             if not user:
                 return None
             
-            return {
-                "id": user.id,
-                "username": user.username,
-                "role": user.role,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "updated_at": user.updated_at.isoformat() if user.updated_at else None,
-                "last_login": user.last_login.isoformat() if user.last_login else None,
-            }
+            return UserService._user_to_dict(user)
             
         except SQLAlchemyError as e:
             logger.error(f"Database error getting user: {e}")
@@ -132,6 +177,9 @@ class UserService:
         """
         Get user by username.
         
+        Not cached: the result carries the password hash and is only
+        used on the (rate-limited) login path.
+        
         Args:
             username: Username
             
@@ -140,20 +188,11 @@ class UserService:
         """
         db: Session = get_db_session()
         try:
-            user = db.query(User).filter(User.username == username).first()
+            user = db.execute(_USER_BY_USERNAME, {"username": username}).scalar()
             if not user:
                 return None
             
-            return {
-                "id": user.id,
-                "username": user.username,
-                "password_hash": user.password_hash,
-                "role": user.role,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "updated_at": user.updated_at.isoformat() if user.updated_at else None,
-                "last_login": user.last_login.isoformat() if user.last_login else None,
-            }
+            return UserService._user_to_dict(user, include_hash=True)
             
         except SQLAlchemyError as e:
             logger.error(f"Database error getting user by username: {e}")
@@ -178,19 +217,13 @@ class UserService:
         """
         db: Session = get_db_session()
         try:
-            user = db.query(User).filter(User.id == user_id).first()
+            user = db.get(User, user_id)
             if not user:
                 return None
             
             # Update allowed fields
             if "username" in kwargs:
-                # Check if new username is already taken
-                existing = db.query(User).filter(
-                    User.username == kwargs["username"],
-                    User.id != user_id
-                ).first()
-                if existing:
-                    raise ValueError(f"Username '{kwargs['username']}' already exists")
+                # A taken username is rejected by the unique index on commit
                 user.username = kwargs["username"]
             
             if "role" in kwargs:
@@ -203,32 +236,29 @@ class UserService:
             
             user.updated_at = datetime.now(timezone.utc)
             
+            # Serialize before commit expires the attributes, instead of a refresh SELECT
+            db.flush()
+            result = UserService._user_to_dict(user)
             db.commit()
-            db.refresh(user)
+            invalidate_user(user_id)
+            SessionService.invalidate_cached_sessions(user_id)
             
             logger.info(f"Updated user: {user_id}")
             
-            return {
-                "id": user.id,
-                "username": user.username,
-                "role": user.role,
-                "is_active": user.is_active,
-                "created_at": user.created_at.isoformat() if user.created_at else None,
-                "updated_at": user.updated_at.isoformat() if user.updated_at else None,
-                "last_login": user.last_login.isoformat() if user.last_login else None,
-            }
+            return result
             
+        except IntegrityError:
+            db.rollback()
+            raise ValueError(f"Username '{kwargs['username']}' already exists")
         except SQLAlchemyError as e:
             db.rollback()
             logger.error(f"Database error updating user: {e}")
             raise ValueError(f"Failed to update user: {e}")
         except ValueError:
-            db.rollback()
             raise
         except Exception as e:
-            db.rollback()
             logger.error(f"Error updating user: {e}")
-            raise ValueError(f"Failed to update user: {e}")
+            raise ValueError(f"Failed to update user: {e}") from e
         finally:
             db.close()
     
@@ -245,12 +275,18 @@ class UserService:
         """
         db: Session = get_db_session()
         try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
+            # Bulk-delete dependent rows, then the user, without loading any of them
+            # (same effect as the relationships' ORM delete cascade)
+            params = {"user_id": user_id}
+            db.execute(_DELETE_USER_TOKENS, params)
+            db.execute(_DELETE_USER_SESSIONS, params)
+            result = db.execute(_DELETE_USER, params)
+            if result.rowcount != 1:
                 return False
             
-            db.delete(user)
             db.commit()
+            invalidate_user(user_id)
+            SessionService.invalidate_cached_sessions(user_id)
             
             logger.info(f"Deleted user: {user_id}")
             return True
@@ -260,7 +296,6 @@ class UserService:
             logger.error(f"Database error deleting user: {e}")
             return False
         except Exception as e:
-            db.rollback()
             logger.error(f"Error deleting user: {e}")
             return False
         finally:
@@ -277,25 +312,50 @@ class UserService:
         Returns:
             List of user dicts
         """
+        return UserService.list_users_as_dicts(role)
+    
+    @staticmethod
+    def list_users_as_dicts(role: Optional[str] = None) -> List[Dict]:
+        """
+        List all users as response-shaped dicts, without loading ORM objects.
+        
+        Selects only the public columns and builds every row in a single
+        comprehension, for endpoints that serialize the result directly.
+        
+        Args:
+            role: Optional role filter
+            
+        Returns:
+            List of user dicts
+        """
+        columns = (
+            User.id,
+            User.username,
+            User.role,
+            User.is_active,
+            User.created_at,
+            User.updated_at,
+            User.last_login,
+        )
         db: Session = get_db_session()
         try:
-            query = db.query(User)
+            query = select(*columns)
             if role:
-                query = query.filter(User.role == role)
+                query = query.where(User.role == role)
             
-            users = query.order_by(User.created_at.desc()).all()
+            rows = db.execute(query.order_by(User.created_at.desc())).all()
             
             return [
                 {
-                    "id": user.id,
-                    "username": user.username,
-                    "role": user.role,
-                    "is_active": user.is_active,
-                    "created_at": user.created_at.isoformat() if user.created_at else None,
-                    "updated_at": user.updated_at.isoformat() if user.updated_at else None,
-                    "last_login": user.last_login.isoformat() if user.last_login else None,
+                    "id": id_,
+                    "username": username,
+                    "role": role_,
+                    "is_active": is_active,
+                    "created_at": _isoformat_utc(created_at),
+                    "updated_at": _isoformat_utc(updated_at),
+                    "last_login": _isoformat_utc(last_login),
                 }
-                for user in users
+                for id_, username, role_, is_active, created_at, updated_at, last_login in rows
             ]
             
         except SQLAlchemyError as e:
@@ -327,7 +387,7 @@ class UserService:
         
         db: Session = get_db_session()
         try:
-            user = db.query(User).filter(User.id == user_id).first()
+            user = db.get(User, user_id)
             if not user:
                 return False
             
@@ -340,6 +400,8 @@ class UserService:
             user.updated_at = datetime.now(timezone.utc)
             
             db.commit()
+            invalidate_user(user_id)
+            SessionService.invalidate_cached_sessions(user_id)
             
             logger.info(f"Changed password for user: {user_id}")
             return True
@@ -349,7 +411,6 @@ class UserService:
             logger.error(f"Database error changing password: {e}")
             return False
         except Exception as e:
-            db.rollback()
             logger.error(f"Error changing password: {e}")
             return False
         finally:
@@ -372,17 +433,22 @@ class UserService:
         if not is_valid:
             raise ValueError(error_msg)
         
+        # Hash before opening the session so no connection is held meanwhile
+        password_hash = hash_password(new_password)
+        
         db: Session = get_db_session()
         try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
+            # Update password in a single statement
+            result = db.execute(
+                _UPDATE_PASSWORD,
+                {"user_id": user_id, "new_hash": password_hash, "now": datetime.now(timezone.utc)},
+            )
+            if result.rowcount != 1:
                 return False
             
-            # Update password
-            user.password_hash = hash_password(new_password)
-            user.updated_at = datetime.now(timezone.utc)
-            
             db.commit()
+            invalidate_user(user_id)
+            SessionService.invalidate_cached_sessions(user_id)
             
             logger.info(f"Reset password for user: {user_id}")
             return True
@@ -392,12 +458,51 @@ class UserService:
             logger.error(f"Database error resetting password: {e}")
             return False
         except Exception as e:
-            db.rollback()
             logger.error(f"Error resetting password: {e}")
             return False
         finally:
             db.close()
     
+    @staticmethod
+    def upgrade_password_hash(user_id: int, old_hash: str, new_hash: str) -> bool:
+        """
+        Replace a stored hash with one of the same password in the current scheme.
+        
+        Only applies if the stored hash is still old_hash, so a concurrent
+        password change is never overwritten. Sessions stay valid.
+        
+        Args:
+            user_id: User ID
+            old_hash: Hash the password was verified against
+            new_hash: hash_password() of the same password
+            
+        Returns:
+            True if upgraded, False if the user or hash changed meanwhile
+        """
+        db: Session = get_db_session()
+        try:
+            result = db.execute(
+                _UPGRADE_PASSWORD_HASH,
+                {"user_id": user_id, "old_hash": old_hash, "new_hash": new_hash},
+            )
+            db.commit()
+            if result.rowcount != 1:
+                return False
+            
+            invalidate_user(user_id)
+            logger.info(f"Upgraded password hash for user: {user_id}")
+            return True
+            
+        except SQLAlchemyError as e:
+            db.rollback()
+            logger.error(f"Database error upgrading password hash: {e}")
+            return False
+        except Exception as e:
+            logger.error(f"Error upgrading password hash: {e}")
+            return False
+        finally:
+            db.close()
+    
     @staticmethod
     def update_last_login(user_id: int) -> bool:
         """
@@ -411,13 +516,14 @@ class UserService:
         """
         db: Session = get_db_session()
         try:
-            user = db.query(User).filter(User.id == user_id).first()
-            if not user:
-                return False
-            
-            user.last_login = datetime.now(timezone.utc)
+            result = db.execute(
+                _UPDATE_LAST_LOGIN, {"user_id": user_id, "now": datetime.now(timezone.utc)}
+            )
             db.commit()
+            if result.rowcount != 1:
+                return False
             
+            invalidate_user(user_id)
             return True
             
         except SQLAlchemyError as e:
@@ -425,7 +531,6 @@ class UserService:
             logger.error(f"Database error updating last login: {e}")
             return False
         except Exception as e:
-            db.rollback()
             logger.error(f"Error updating last login: {e}")
             return False
         finally:
@@ -1,13 +1,13 @@
 """Agent definition for ADK web interface."""
 
 import os
-import sys
 import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
-# Add backend to path
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
-
+# `adk web` puts the agents directory (the repository root) on sys.path,
+# so the backend package imports directly
 from backend.services.sreagent.agent import create_sre_agent
 from backend.services.sreagent.mcp_client import create_mcp_tools
 
@@ -29,6 +29,59 @@ async def _init_agent():
         logger.info("Initializing agent without MCP tools...")
         return create_sre_agent(mcp_tools=[])
 
-# Create root_agent for ADK web interface
-root_agent = asyncio.run(_init_agent())
+# Built on first use rather than at import, so importing this module
+# neither blocks on the MCP handshake nor needs its own event loop
+_root_agent = None
+_init_task: Optional[asyncio.Future] = None
+
+
+async def get_root_agent():
+    """
+    Return the root agent, initializing it once on first call.
+    
+    This is the supported entry point from async code; it builds the agent
+    (and its MCP sessions) on the caller's own event loop.
+    """
+    global _root_agent, _init_task
+    if _root_agent is None:
+        # Concurrent first callers share one initialization
+        if _init_task is None:
+            _init_task = asyncio.ensure_future(_init_agent())
+        _root_agent = await _init_task
+    return _root_agent
+
+
+def init_sync():
+    """
+    Return the root agent from synchronous code, blocking until it is built.
+    
+    Prefer awaiting get_root_agent() from async code. If an event loop is
+    already running in this thread (e.g. adk web reading root_agent from an
+    async handler), initialization runs on a helper thread with a private
+    loop and this call blocks the running loop for the whole MCP handshake.
+    That private loop is closed afterwards, so MCP connections opened during
+    initialization do not survive it.
+    """
+    global _root_agent
+    if _root_agent is not None:
+        return _root_agent
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(get_root_agent())
+    # Can't nest asyncio.run() in a running loop, and _init_task (if any)
+    # belongs to that loop, so build on a private loop in a helper thread
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="root-agent-init") as pool:
+        agent = pool.submit(asyncio.run, _init_agent()).result()
+    if _root_agent is None:
+        _root_agent = agent
+    return _root_agent
+
+
+def __getattr__(name):
+    # ADK web reads root_agent as a module attribute; build it on first access
+    # (blocking, see init_sync)
+    if name == "root_agent":
+        return init_sync()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
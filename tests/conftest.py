@@ -0,0 +1,46 @@
+"""Shared fixtures for the integration tests."""
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--run-cluster",
+        action="store_true",
+        default=False,
+        help="run tests marked 'cluster' (they shell out to kubectl)",
+    )
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "cluster: needs kubectl and a cluster; skipped unless --run-cluster is given"
+    )
+    # Registered by pytest-xdist when installed; declared here so serial runs
+    # without it don't warn about an unknown marker
+    config.addinivalue_line(
+        "markers", "xdist_group(name): run tests sharing a group on the same xdist worker"
+    )
+
+
+def pytest_collection_modifyitems(config, items):
+    # Skip cluster tests at collection time so they never fork kubectl
+    if config.getoption("--run-cluster"):
+        return
+    skip_cluster = pytest.mark.skip(reason="cluster test - pass --run-cluster to run")
+    for item in items:
+        if "cluster" in item.keywords:
+            item.add_marker(skip_cluster)
+
+
+@pytest.fixture(scope="session")
+def http():
+    """Shared HTTP session so tests reuse keep-alive connections to the services."""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=20, max_retries=0)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    yield session
+    session.close()
@@ -20,17 +20,17 @@ class TestAgentIntegration:
         """Generate a unique session ID for tests."""
         return f"test_session_{int(time.time())}"
     
-    def test_agent_initialization(self, sreagent_url):
+    def test_agent_initialization(self, http, sreagent_url):
         """Test that agent is properly initialized."""
         try:
-            response = requests.get(f"{sreagent_url}/health", timeout=5)
+            response = http.get(f"{sreagent_url}/health", timeout=5)
             assert response.status_code == 200
             data = response.json()
             assert data["agent_ready"] is True, "Agent should be ready"
         except requests.exceptions.ConnectionError:
             pytest.skip("SRE Agent not available")
     
-    def test_simple_chat_interaction(self, sreagent_url, session_id):
+    def test_simple_chat_interaction(self, http, sreagent_url, session_id):
         """Test basic chat interaction with agent."""
         try:
             payload = {
@@ -38,7 +38,7 @@ class TestAgentIntegration:
                 "user_id": "test_user",
                 "session_id": session_id,
             }
-            response = requests.post(
+            response = http.post(
                 f"{sreagent_url}/chat",
                 json=payload,
                 timeout=30,
@@ -51,7 +51,7 @@ class TestAgentIntegration:
         except requests.exceptions.ConnectionError:
             pytest.skip("SRE Agent not available")
     
-    def test_k8s_troubleshooting_query(self, sreagent_url, session_id):
+    def test_k8s_troubleshooting_query(self, http, sreagent_url, session_id):
         """Test agent response to K8s troubleshooting query."""
         try:
             payload = {
@@ -59,7 +59,7 @@ class TestAgentIntegration:
                 "user_id": "test_user",
                 "session_id": session_id,
             }
-            response = requests.post(
+            response = http.post(
                 f"{sreagent_url}/chat",
                 json=payload,
                 timeout=30,
@@ -71,7 +71,7 @@ class TestAgentIntegration:
         except requests.exceptions.ConnectionError:
             pytest.skip("SRE Agent not available")
     
-    def test_session_persistence(self, sreagent_url, session_id):
+    def test_session_persistence(self, http, sreagent_url, session_id):
         """Test that session persists across multiple messages."""
         try:
             # First message
@@ -80,7 +80,7 @@ class TestAgentIntegration:
                 "user_id": "test_user",
                 "session_id": session_id,
             }
-            response1 = requests.post(
+            response1 = http.post(
                 f"{sreagent_url}/chat",
                 json=payload1,
                 timeout=30,
@@ -93,7 +93,7 @@ class TestAgentIntegration:
                     "user_id": "test_user",
                     "session_id": session_id,
                 }
-                response2 = requests.post(
+                response2 = http.post(
                     f"{sreagent_url}/chat",
                     json=payload2,
                     timeout=30,
@@ -104,11 +104,11 @@ class TestAgentIntegration:
         except requests.exceptions.ConnectionError:
             pytest.skip("SRE Agent not available")
     
-    def test_mcp_tool_invocation(self, sreagent_url, session_id):
+    def test_mcp_tool_invocation(self, http, sreagent_url, session_id):
         """Test that agent can invoke MCP tools (if MCP is connected)."""
         try:
             # Check health first to see if MCP is connected
-            health_response = requests.get(f"{sreagent_url}/health", timeout=5)
+            health_response = http.get(f"{sreagent_url}/health", timeout=5)
             if health_response.status_code == 200:
                 health_data = health_response.json()
                 mcp_connected = health_data.get("mcp_connected", False)
@@ -120,7 +120,7 @@ class TestAgentIntegration:
                         "user_id": "test_user",
                         "session_id": session_id,
                     }
-                    response = requests.post(
+                    response = http.post(
                         f"{sreagent_url}/chat",
                         json=payload,
                         timeout=60,  # Longer timeout for tool execution
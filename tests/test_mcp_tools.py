@@ -1,119 +1,176 @@
 """Tests for MCP tools validation."""
 
+import os
+import json
+import shutil
 import pytest
 import requests
 import time
 import subprocess
-import json
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
 
+# Seconds to wait on health checks; reachability is probed once up front
+PROBE_TIMEOUT = 2
 
-class TestMCPTools:
-    """Test suite for validating MCP tools from kubernetes-mcp-server."""
-    
-    @pytest.fixture
-    def mcp_server_url(self):
-        """Get MCP server URL from environment or use default."""
-        import os
-        return os.getenv("MCP_SERVER_URL", "http://localhost:8080")
+HEALTH_PATH = "/health"
+CHAT_PATH = "/chat"
+
+# Chat request body, serialized once for all runs
+CHAT_BODY = json.dumps({
+    "message": "List all pods in default namespace",
+    "user_id": "test_user",
+}).encode()
+JSON_HEADERS = {"Content-Type": "application/json"}
+
+
+@pytest.fixture(scope="session")
+def mcp_server_url():
+    """Get MCP server URL from environment or use default."""
+    return os.getenv("MCP_SERVER_URL", "http://localhost:8080")
+
+
+@pytest.fixture(scope="session")
+def sreagent_url():
+    """Get SRE Agent URL from environment or use default."""
+    return os.getenv("SREAGENT_URL", "http://localhost:8000")
+
+
+@pytest.fixture(scope="session")
+def kubectl() -> Optional[str]:
+    """Absolute path of the kubectl binary, resolved once, or None if not installed."""
+    return shutil.which("kubectl")
+
+
+@pytest.fixture(scope="session")
+def mcp_server_pod_phases(kubectl) -> List[str]:
+    """
+    Phases of the kubernetes-mcp-server pods, fetched with one kubectl call per session.
     
-    @pytest.fixture
-    def sreagent_url(self):
-        """Get SRE Agent URL from environment or use default."""
-        import os
-        return os.getenv("SREAGENT_URL", "http://localhost:8000")
+    Skips dependent tests when kubectl is missing or the cluster can't be queried.
+    """
+    if kubectl is None:
+        pytest.skip("Cannot check pod status - kubectl not available")
+    try:
+        # Ask kubectl for just the pod phases instead of the full pod JSON
+        result = subprocess.run(
+            [
+                kubectl, "get", "pods", "-l", "app=kubernetes-mcp-server",
+                "-o", "jsonpath={.items[*].status.phase}",
+            ],
+            capture_output=True,
+            timeout=10,
+        )
+    except subprocess.TimeoutExpired:
+        pytest.skip("Cannot check pod status - may not be in cluster")
+    if result.returncode != 0:
+        pytest.skip("kubectl command failed - may not be in cluster context")
+    return result.stdout.decode().split()
+
+
+@pytest.fixture(scope="session")
+def services_up(http, mcp_server_url, sreagent_url) -> Dict[str, bool]:
+    """
+    Probe both services once, concurrently, so absent services cost one timeout.
     
-    def test_mcp_server_connectivity(self, mcp_server_url):
-        """Test that MCP server is accessible."""
+    Returns:
+        Dict with "mcp_server" and "sreagent" reachability flags
+    """
+    def reachable(url: str) -> bool:
         try:
-            # Try to connect to MCP server
-            # Note: Actual MCP protocol may require specific endpoints
-            response = requests.get(f"{mcp_server_url}/health", timeout=5)
-            assert response.status_code in [200, 404], "MCP server should be accessible"
-        except requests.exceptions.ConnectionError:
-            pytest.skip("MCP server not available - skipping connectivity test")
+            http.get(f"{url}{HEALTH_PATH}", timeout=PROBE_TIMEOUT)
+            return True
+        except requests.exceptions.RequestException:
+            return False
     
-    def test_sreagent_health(self, sreagent_url):
-        """Test that SRE Agent health endpoint works."""
-        try:
-            response = requests.get(f"{sreagent_url}/health", timeout=5)
-            assert response.status_code == 200, "Health endpoint should return 200"
-            data = response.json()
-            assert "status" in data, "Health response should contain status"
-            assert data["status"] == "healthy", "Status should be healthy"
-        except requests.exceptions.ConnectionError:
-            pytest.skip("SRE Agent not available - skipping health test")
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        mcp_server = pool.submit(reachable, mcp_server_url)
+        sreagent = pool.submit(reachable, sreagent_url)
+        return {"mcp_server": mcp_server.result(), "sreagent": sreagent.result()}
+
+
+@pytest.fixture
+def require_mcp_server(services_up):
+    """Skip the test before it runs when the MCP server is unreachable."""
+    if not services_up["mcp_server"]:
+        pytest.skip("MCP server not available")
+
+
+@pytest.fixture
+def require_sreagent(services_up):
+    """Skip the test before it runs when the SRE Agent is unreachable."""
+    if not services_up["sreagent"]:
+        pytest.skip("SRE Agent not available")
+
+
+@pytest.fixture(scope="session")
+def health_response(http, services_up, sreagent_url) -> requests.Response:
+    """SRE Agent /health response, fetched once and shared by the health checks."""
+    if not services_up["sreagent"]:
+        pytest.skip("SRE Agent not available")
+    return http.get(f"{sreagent_url}{HEALTH_PATH}", timeout=PROBE_TIMEOUT)
+
+
+class TestMCPTools:
+    """
+    Test suite for validating MCP tools from kubernetes-mcp-server.
     
-    def test_sreagent_mcp_connection(self, sreagent_url):
-        """Test that SRE Agent reports MCP connection status."""
-        try:
-            response = requests.get(f"{sreagent_url}/health", timeout=5)
-            assert response.status_code == 200
-            data = response.json()
-            assert "mcp_connected" in data, "Health should report MCP connection status"
-            # MCP connection may be False if server is not available, which is acceptable
-        except requests.exceptions.ConnectionError:
-            pytest.skip("SRE Agent not available - skipping MCP connection test")
+    Tests are independent and safe to run with pytest-xdist
+    (-n auto --dist loadgroup); the kubectl tests share one worker.
+    """
+    
+    @pytest.mark.usefixtures("require_mcp_server")
+    def test_mcp_server_connectivity(self, http, mcp_server_url):
+        """Test that MCP server is accessible."""
+        # Note: Actual MCP protocol may require specific endpoints
+        response = http.get(f"{mcp_server_url}{HEALTH_PATH}", timeout=PROBE_TIMEOUT)
+        assert response.status_code in [200, 404], "MCP server should be accessible"
+    
+    @pytest.mark.parametrize("field,expected", [
+        ("status", "healthy"),
+        # MCP connection may be False if server is not available, which is acceptable
+        ("mcp_connected", None),
+    ])
+    def test_sreagent_health(self, health_response, field, expected):
+        """Test that SRE Agent health endpoint reports a field (and its value, if expected is set)."""
+        assert health_response.status_code == 200, "Health endpoint should return 200"
+        data = health_response.json()
+        assert field in data, f"Health response should contain {field}"
+        if expected is not None:
+            assert data[field] == expected, f"{field} should be {expected!r}"
     
-    def test_agent_chat_endpoint(self, sreagent_url):
+    @pytest.mark.usefixtures("require_sreagent")
+    def test_agent_chat_endpoint(self, http, sreagent_url):
         """Test that chat endpoint accepts requests."""
-        try:
-            payload = {
-                "message": "List all pods in default namespace",
-                "user_id": "test_user",
-            }
-            response = requests.post(
-                f"{sreagent_url}/chat",
-                json=payload,
-                timeout=30,
-            )
-            # Should return 200 or 503 (if agent not ready)
-            assert response.status_code in [200, 503], "Chat endpoint should respond"
-            if response.status_code == 200:
-                data = response.json()
-                assert "response" in data, "Chat response should contain response field"
-                assert "session_id" in data, "Chat response should contain session_id"
-        except requests.exceptions.ConnectionError:
-            pytest.skip("SRE Agent not available - skipping chat test")
+        response = http.post(
+            f"{sreagent_url}{CHAT_PATH}",
+            data=CHAT_BODY,
+            headers=JSON_HEADERS,
+            timeout=30,
+        )
+        # Should return 200 or 503 (if agent not ready)
+        assert response.status_code in [200, 503], "Chat endpoint should respond"
+        if response.status_code == 200:
+            data = response.json()
+            assert "response" in data, "Chat response should contain response field"
+            assert "session_id" in data, "Chat response should contain session_id"
     
-    def test_mcp_tools_available(self):
+    @pytest.mark.cluster
+    def test_mcp_tools_available(self, kubectl):
         """Test that MCP tools are available via kubectl or direct check."""
         # This test would require actual MCP server connection
-        # For now, we'll check if kubectl is available as a proxy test
-        try:
-            result = subprocess.run(
-                ["kubectl", "version", "--client"],
-                capture_output=True,
-                timeout=5,
-            )
-            # kubectl availability is a proxy for MCP server capability
-            assert result.returncode == 0, "kubectl should be available for MCP tools"
-        except (subprocess.TimeoutExpired, FileNotFoundError):
-            pytest.skip("kubectl not available - skipping MCP tools test")
+        # For now, we'll check if kubectl is available as a proxy test;
+        # the kubectl fixture looks it up on PATH without running it
+        assert kubectl is not None, "kubectl should be available for MCP tools"
     
-    def test_kubernetes_mcp_server_pod_running(self):
+    @pytest.mark.cluster
+    @pytest.mark.xdist_group("kubectl")
+    def test_kubernetes_mcp_server_pod_running(self, mcp_server_pod_phases):
         """Test that kubernetes-mcp-server pod is running in cluster."""
-        try:
-            result = subprocess.run(
-                ["kubectl", "get", "pods", "-l", "app=kubernetes-mcp-server", "-o", "json"],
-                capture_output=True,
-                timeout=10,
-            )
-            if result.returncode == 0:
-                pods = json.loads(result.stdout)
-                if pods.get("items"):
-                    # Check if at least one pod is running
-                    running_pods = [
-                        p for p in pods["items"]
-                        if p.get("status", {}).get("phase") == "Running"
-                    ]
-                    assert len(running_pods) > 0, "At least one MCP server pod should be running"
-                else:
-                    pytest.skip("No kubernetes-mcp-server pods found")
-            else:
-                pytest.skip("kubectl command failed - may not be in cluster context")
-        except (subprocess.TimeoutExpired, FileNotFoundError, json.JSONDecodeError):
-            pytest.skip("Cannot check pod status - may not be in cluster")
+        if not mcp_server_pod_phases:
+            pytest.skip("No kubernetes-mcp-server pods found")
+        # Check if at least one pod is running
+        assert "Running" in mcp_server_pod_phases, "At least one MCP server pod should be running"
 
 
 if __name__ == "__main__":